@@ -0,0 +1,68 @@
+"""
+Measures cold start of the name detector in fresh interpreters: package import, checkpoint loading and the first
+prediction, for the joblib and the inference-only pipeline checkpoints.
+
+Usage: python benchmarks/cold_start.py [--repeat 5] [--output cold_start.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from name_detector.detect_names import CHECKPOINTS_DIR
+from name_detector.model import CatBoostModel
+from name_detector.pipeline import TextPipeline
+imported = time.perf_counter()
+pipeline = TextPipeline.init_from(f"{CHECKPOINTS_DIR}/{sys.argv[1]}")
+model = CatBoostModel.init_from(f"{CHECKPOINTS_DIR}/catboost_model.cbm")
+loaded = time.perf_counter()
+X, _ = pipeline.transform(pipeline.get_windows("Алиҷон Валиев рӯз аз рӯз худро беҳтар ҳис менамуд"))
+model.predict_proba(X)
+predicted = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "load_s": loaded - imported,
+    "first_predict_s": predicted - loaded,
+    "total_s": predicted - start,
+}))
+"""
+
+
+def measure(checkpoint: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, checkpoint], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def run(repeat: int = 5) -> dict:
+    return {checkpoint: measure(checkpoint, repeat) for checkpoint in ["pipeline.joblib", "pipeline_inference.bin"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per checkpoint, median is reported.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for checkpoint, timings in results.items():
+        print(f"{checkpoint:24s}" + "  ".join(f"{key} {value:.3f}" for key, value in timings.items()))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Seeded generator of synthetic chat messages in Tajik, Russian and Latin-script Tajik, some of them with full names,
+so that benchmarks run on the same corpus on every machine without any private data.
+"""
+
+import random
+
+FIRST_NAMES = {
+    "tajik": ["Алиҷон", "Фарҳод", "Гулрӯ", "Рустам", "Шоҳина", "Меҳрубон", "Ҷамшед", "Зарина", "Қодир", "Ғафур"],
+    "russian": ["Алексей", "Мария", "Сергей", "Наталья", "Дмитрий", "Ольга", "Игорь", "Татьяна"],
+    "latin": ["alijon", "farhod", "gulru", "rustam", "shohina", "jamshed", "zarina", "qodir", "mehrubon"],
+}
+LAST_NAMES = {
+    "tajik": ["Валиев", "Раҳимов", "Фаридунова", "Комронов", "Ҷураева", "Қурбонов", "Назарова", "Шарипов"],
+    "russian": ["Иванов", "Смирнова", "Кузнецов", "Попова", "Волков", "Соколова"],
+    "latin": ["valiev", "rahimov", "faridunova", "komronov", "juraeva", "qurbonov", "nazarova", "sharipov"],
+}
+WORDS = {
+    "tajik": (
+        "салом пул корти ман баста шуд чӣ кор кунам раҳмат ҳамма чиз хуб пайваст буд рӯз аз худро беҳтар ҳис менамуд "
+        "ба гузаронед илтимос кай"
+    ).split(),
+    "russian": (
+        "здравствуйте перевод на карту не дошёл почему приложение уже два дня спасибо пожалуйста помогите оплата счёт "
+        "когда вернут деньги"
+    ).split(),
+    "latin": (
+        "salom pul korti man basta shud chi kor kunam rahmat hamma khub pochemu tranzaksiya cherez prilozhenie uzhe "
+        "kay meshavad partoftam"
+    ).split(),
+}
+PUNCTUATION = ["", "", "", ",", ".", "!", "?", "..."]
+
+
+def generate_message(rng: random.Random, name_share: float = 0.3) -> str:
+    """
+    :return: A message of 3-25 words in one script, with a full name at a random position in ``name_share`` of them.
+    """
+    script = rng.choice(list(WORDS))
+    words = [rng.choice(WORDS[script]) for _ in range(rng.randint(3, 25))]
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words) + 1), str(rng.randint(1, 100000)))
+    if rng.random() < name_share:
+        name = [rng.choice(FIRST_NAMES[script]), rng.choice(LAST_NAMES[script])]
+        words[rng.randrange(len(words)) : 0] = name if script == "latin" or rng.random() < 0.5 else name[::-1]
+    return " ".join(word + rng.choice(PUNCTUATION) for word in words)
+
+
+def generate_corpus(size: int, seed: int = 0, name_share: float = 0.3) -> list[str]:
+    """
+    :param size: The number of messages.
+    :param seed: The random seed, the same seed yields the same corpus.
+    :param name_share: The share of messages with a full name.
+    :return: A list of messages.
+    """
+    rng = random.Random(seed)
+    return [generate_message(rng, name_share) for _ in range(size)]
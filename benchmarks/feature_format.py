@@ -0,0 +1,82 @@
+"""
+Compares the feature formats CatBoost is scored with: the scipy CSR matrix, the dense float32 array written into a
+reusable buffer, and a catboost.Pool built from that array. For every batch size it reports the median time per
+batch of featurizing (including building the Pool) and scoring, split into the two stages.
+
+Usage: python benchmarks/feature_format.py [--batch-sizes 1 16 256 2048] [--repeat 5] [--output feature_format.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from name_detector.detect_names import NameDetector  # noqa: E402
+
+TEXTS = [
+    "Алиҷон Валиев рӯз аз рӯз худро беҳтар ҳис менамуд",
+    "Салом, пулро ба корти Рустами Фарҳод гузаронед",
+    "Pochemu tranzaksiya cherez prilozhenie uzhe 2 dnya ne prohodit",
+    "Мавзӯи дарс: таърихи Бухоро ва Самарқанд",
+    "faridunova gulru 44 somoni",
+    "Корти Салом дар Душанбе",
+]
+
+
+def measure(name_detector: NameDetector, windows: list[str], repeat: int) -> dict:
+    featurize, score = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        X_input = name_detector.featurize_windows(windows)
+        featurized = time.perf_counter()
+        name_detector.model.predict_proba(X_input)
+        featurize.append(featurized - start)
+        score.append(time.perf_counter() - featurized)
+
+    featurize_s, score_s = statistics.median(featurize), statistics.median(score)
+    return {"featurize_s": featurize_s, "score_s": score_s, "total_s": featurize_s + score_s}
+
+
+def run(batch_sizes: list[int], repeat: int = 5) -> dict:
+    detectors = {
+        feature_format: NameDetector(feature_format=feature_format) for feature_format in NameDetector.FEATURE_FORMATS
+    }
+    pipeline = detectors["sparse"].pipeline
+    corpus = [window for text in TEXTS for window in pipeline.get_windows(text)]
+
+    results: dict = {}
+    for batch_size in batch_sizes:
+        windows = (corpus * (batch_size // len(corpus) + 1))[:batch_size]
+        results[batch_size] = {
+            feature_format: measure(name_detector, windows, repeat)
+            for feature_format, name_detector in detectors.items()
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256, 2048], help="Windows per batch.")
+    parser.add_argument("--repeat", type=int, default=5, help="Batches per measurement, median is reported.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = run(args.batch_sizes, args.repeat)
+    for batch_size, formats in results.items():
+        for feature_format, timings in formats.items():
+            print(
+                f"{batch_size:6d} {feature_format:8s}"
+                + "  ".join(f"{key} {value:.4f}" for key, value in timings.items())
+            )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Measures the per-character cost of the text normalization utilities on chat-like messages: normalize_cyrillic,
+latinize_text and transliterate, next to the per-character loops they replaced.
+
+Usage: python benchmarks/normalization.py [--repeat 20] [--output normalization.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from name_detector.data_preparation import (  # noqa: E402
+    _tajik_to_russian_table,
+    normalize_cyrillic,
+)
+from name_detector.utils import (  # noqa: E402
+    Transliterator,
+    _cyrillic_to_latin_table,
+    latinize_text,
+    transliterate,
+)
+
+MESSAGES = [
+    "Салом! Пулро ба корти Рустами Фарҳод гузаронед, илтимос",
+    "Алиҷон Валиев рӯз аз рӯз худро беҳтар ҳис менамуд",
+    "Pochemu tranzaksiya cherez prilozhenie uzhe 2 dnya ne prohodit???",
+    "salom aka, gulru faridunova 500 somoni qarz dorad",
+    "Здравствуйте, перевод на карту Шохина Джураева не дошёл",
+    "Корти Салом баста шуд, чӣ кор кунам?",
+    "rahmat, hamma chiz khub. Zhavob mediham",
+    "Модараш Марям аз ин хушҳол буд 😊",
+]
+
+
+def _normalize_cyrillic_loop(text: str) -> str:
+    for tajik_letter, russian_letter in {chr(k): v for k, v in _tajik_to_russian_table.items()}.items():
+        text = text.replace(tajik_letter, russian_letter)
+    return text
+
+
+def _latinize_text_loop(name: str) -> str:
+    latinized_text = ""
+    for char in name:
+        latinized_text += _cyrillic_to_latin_table.get(ord(char), char)
+    return latinized_text
+
+
+def _transliterate_loop(text: str) -> str:
+    translit_dict = Transliterator.translit_dict
+    text = text.lower()
+    for special in Transliterator.special_cases:
+        if special in text:
+            text = text.replace(special, translit_dict[special])
+    transliterated_text = ""
+    for char in text:
+        transliterated_text += translit_dict.get(char, char)
+    return transliterated_text
+
+
+FUNCTIONS = {
+    "normalize_cyrillic": (normalize_cyrillic, _normalize_cyrillic_loop),
+    "latinize_text": (latinize_text, _latinize_text_loop),
+    "transliterate": (transliterate, _transliterate_loop),
+}
+
+
+def measure(function, texts: list[str], repeat: int) -> float:
+    """:return: The median time per input character in nanoseconds."""
+    n_chars = sum(len(text) for text in texts)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            function(text)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) / n_chars * 1e9
+
+
+def run(repeat: int = 20) -> dict:
+    # Words are what the featurizers normalize, whole messages are what augmentation latinizes
+    words = [word for message in MESSAGES for word in message.split()] * 50
+    messages = MESSAGES * 50
+    results = {}
+    for name, (function, loop) in FUNCTIONS.items():
+        for inputs, texts in [("words", words), ("messages", messages)]:
+            assert all(function(text) == loop(text) for text in texts)
+            results[f"{name}/{inputs}"] = {
+                "table_ns_per_char": measure(function, texts, repeat),
+                "loop_ns_per_char": measure(loop, texts, repeat),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the corpus, median is reported.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for name, timings in results.items():
+        print(f"{name:30s}" + "  ".join(f"{key} {value:.1f}" for key, value in timings.items()))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
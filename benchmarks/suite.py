@@ -0,0 +1,207 @@
+"""
+Benchmark suite of the inference and training paths on a synthetic chat corpus (see corpus.py):
+
+- cold_start: fresh interpreter import, checkpoint loading and first prediction (see cold_start.py)
+- latency: single-text ``predict`` latency percentiles
+- throughput: ``predict_batch`` texts and windows per second for a range of batch sizes
+- stages: time spent in WordFilter, WordSampler, Preprocessor, CharFeaturizer, NameFeaturizer, window assembly and
+  CatBoost on the whole corpus
+- training: augmented transform and featurizer training of a fresh TextPipeline
+
+Every section also records the peak RSS of the process so far. Results are written as JSON together with the commit
+they were measured on, so runs on different commits can be compared.
+
+Usage: python benchmarks/suite.py [--size 2000] [--seed 0] [--sections latency stages] [--output results.json]
+                                  [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cold_start  # noqa: E402
+from corpus import FIRST_NAMES, LAST_NAMES, generate_corpus  # noqa: E402
+
+from name_detector.detect_names import NameDetector  # noqa: E402
+from name_detector.pipeline import TextPipeline  # noqa: E402
+
+SECTIONS = ["cold_start", "latency", "throughput", "stages", "training"]
+
+
+def peak_rss_mb() -> "float|None":
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_latency(name_detector: NameDetector, texts: list[str]) -> dict:
+    for text in texts[:20]:
+        name_detector.predict(text)
+    latencies = np.array([timed(name_detector.predict, text)[0] for text in texts]) * 1000
+    return {
+        "texts": len(texts),
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def bench_throughput(name_detector: NameDetector, texts: list[str], batch_sizes: list[int]) -> dict:
+    results = {}
+    for batch_size in batch_sizes:
+        n_windows = 0
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            windows, _, _ = name_detector.predict_batch(texts[i : i + batch_size])
+            n_windows += sum(len(text_windows) for text_windows in windows)
+        elapsed = time.perf_counter() - start
+        results[batch_size] = {"texts_per_s": len(texts) / elapsed, "windows_per_s": n_windows / elapsed}
+    return results
+
+
+def bench_stages(name_detector: NameDetector, texts: list[str]) -> dict:
+    pipeline = name_detector.pipeline
+    pipeline.disable_token_cache()
+    timings = {}
+
+    timings["WordFilter"], filtered = timed(lambda: [pipeline.filter.filter(text) for text in texts])
+    timings["WordSampler"], windows = timed(
+        lambda: [window for text in filtered for window in pipeline.sampler.sample(text, None)]
+    )
+    timings["Preprocessor"], tokenized = timed(lambda: [pipeline.preprocessor.preprocess(window) for window in windows])
+
+    token_ids: dict[str, int] = {}
+    window_index = np.full((len(tokenized), 3), -1, dtype=np.int64)
+    for row, tokens in enumerate(tokenized):
+        window_index[row, : len(tokens)] = [token_ids.setdefault(token, len(token_ids)) for token in tokens]
+    tokens = list(token_ids)
+
+    timings["CharFeaturizer"], char_rows = timed(pipeline.char_featurizer.transform_tokens, tokens)
+    timings["NameFeaturizer"], name_rows = timed(pipeline.name_featurizer.transform_tokens, tokens)
+    timings["assemble"], X_input = timed(pipeline.assemble, char_rows, name_rows, window_index)
+    timings["CatBoost"], _ = timed(name_detector.model.predict_proba, X_input)
+
+    total = sum(timings.values())
+    return {
+        "texts": len(texts),
+        "windows": len(windows),
+        "distinct_tokens": len(tokens),
+        "seconds": timings,
+        "share": {stage: seconds / total for stage, seconds in timings.items()},
+    }
+
+
+def bench_training(texts: list[str], vocab_size: int = 2000) -> dict:
+    base_names = [name for names in list(FIRST_NAMES.values()) + list(LAST_NAMES.values()) for name in names]
+    timings = {}
+    timings["init"], pipeline = timed(TextPipeline, vocab_size, base_names)
+    timings["train"], _ = timed(pipeline.train, texts)
+    timings["transform_train"], (features, _) = timed(lambda: pipeline.transform(texts, train=True))
+    timings["transform_test"], _ = timed(lambda: pipeline.transform(texts))
+    return {"texts": len(texts), "train_rows": features.shape[0], "features": features.shape[1], "seconds": timings}
+
+
+def git_commit() -> "str|None":
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def run(sections: list[str], size: int = 2000, seed: int = 0, repeat: int = 3, batch_sizes=(1, 8, 32, 128, 512)):
+    texts = generate_corpus(size, seed=seed)
+    results: dict = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "corpus_size": size,
+            "seed": seed,
+        }
+    }
+
+    if "cold_start" in sections:
+        results["cold_start"] = cold_start.run(repeat)
+
+    name_detector = None
+    for section in sections:
+        if section == "cold_start":
+            continue
+        if name_detector is None and section != "training":
+            name_detector = NameDetector()
+
+        if section == "latency":
+            results[section] = bench_latency(name_detector, texts)
+        elif section == "throughput":
+            results[section] = bench_throughput(name_detector, texts, list(batch_sizes))
+        elif section == "stages":
+            runs = [bench_stages(name_detector, texts) for _ in range(repeat)]
+            results[section] = min(runs, key=lambda result: sum(result["seconds"].values()))
+        elif section == "training":
+            results[section] = bench_training(texts)
+        results[section]["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def compare(baseline: dict, results: dict, prefix: str = "") -> list[str]:
+    """
+    :return: Lines with the relative change of every number present in both results, e.g. ``latency.p99_ms +12.5%``.
+    """
+    lines = []
+    for key, value in results.items():
+        if key == "meta":
+            continue
+        name, base = f"{prefix}{key}", baseline.get(str(key))
+        if isinstance(value, dict) and isinstance(base, dict):
+            lines += compare(base, value, f"{name}.")
+        elif isinstance(value, (int, float)) and isinstance(base, (int, float)) and base:
+            lines.append(f"{name:60s} {base:12.4f} -> {value:12.4f}  {(value - base) / base:+.1%}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2000, help="Messages in the synthetic corpus.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of cold start (median) and stages (best).")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128, 512])
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=SECTIONS)
+    parser.add_argument("--output", help="Write the results as JSON to this file, printed to stdout otherwise.")
+    parser.add_argument("--compare", help="Print the relative change of every number against this results file.")
+    args = parser.parse_args()
+
+    results = run(args.sections, size=args.size, seed=args.seed, repeat=args.repeat, batch_sizes=args.batch_sizes)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(json.load(f), json.loads(json.dumps(results)))))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,13 @@
 from .detect_names import NameDetector
+from .incremental import IncrementalScanner
 
-__all__ = ["NameDetector"]
+__all__ = ["AsyncNameDetector", "IncrementalScanner", "NameDetector"]
+
+
+def __getattr__(name):
+    # asyncio is only imported by users of the async API
+    if name == "AsyncNameDetector":
+        from .async_detector import AsyncNameDetector
+
+        return AsyncNameDetector
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
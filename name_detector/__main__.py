@@ -0,0 +1,3 @@
+from name_detector.detect_names import main
+
+main()
@@ -0,0 +1,98 @@
+import asyncio
+from concurrent.futures import Executor
+
+from name_detector.detect_names import NameDetector
+
+
+class AsyncNameDetector:
+    """
+    Asyncio front end of NameDetector that micro-batches concurrent calls.
+
+    Calls to ``detect`` are collected for up to ``max_wait_ms`` or until ``max_batch_size`` texts are pending.
+    Each batch is then scored with a single ``predict_batch`` call in an executor, which keeps CatBoost off
+    the event loop. Every caller gets its own slice of the batch results.
+    """
+
+    def __init__(
+        self,
+        name_detector: "NameDetector|None" = None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        executor: "Executor|None" = None,
+    ):
+        """
+        :param name_detector: The detector to score batches with, a new one is loaded by default.
+        :param max_batch_size: A batch is scored as soon as this many texts are pending.
+        :param max_wait_ms: The longest time the first text of a batch waits for more texts to arrive.
+        :param executor: The executor batches are scored in, the loop's default executor by default.
+        """
+        self.name_detector = name_detector or NameDetector()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: "asyncio.TimerHandle|None" = None
+        self._batches: set[asyncio.Task] = set()
+
+    async def detect(self, text: str):
+        """
+        Predicts probabilities for the windows of a single text.
+
+        :param text: The input text string.
+        :return: A tuple of two items - windows and their probabilities, as returned by ``NameDetector.predict``.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def detect_many(self, texts: list[str]):
+        return await asyncio.gather(*(self.detect(text) for text in texts))
+
+    async def aclose(self):
+        """Scores all pending texts and waits for the batches in flight."""
+        self._flush()
+        if self._batches:
+            await asyncio.gather(*self._batches)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._score(batch))
+            # Keep a reference, otherwise the task may be garbage collected before it is done
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _score(self, batch: list[tuple[str, asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _ in batch]
+        try:
+            windows, probabilities, _ = await loop.run_in_executor(
+                self.executor, self.name_detector.predict_batch, texts
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), text_windows, text_probabilities in zip(batch, windows, probabilities):
+            # Callers may have been cancelled while the batch was scored
+            if not future.done():
+                future.set_result((text_windows, text_probabilities))
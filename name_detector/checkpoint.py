@@ -0,0 +1,115 @@
+"""
+Compact, versioned, serialized inference-only pipeline checkpoint.
+
+The joblib checkpoint pickles the whole training pipeline, including the sklearn vectorizer. Inference only needs
+the char n-gram vocabulary and the prefix automaton of the base names, which this format stores as flat arrays:
+
+    magic (8 bytes) | header length (uint32) | JSON header | padding | arrays
+
+The header holds the format version, the featurizer config and the dtype, shape and offset of every array. Arrays are
+little-endian and 8-byte aligned, so numeric arrays are read straight from the file buffer. Loading is not zero-copy:
+string lists are decoded and the pipeline rebuilds its vocabulary and automaton dicts from the arrays.
+"""
+
+import json
+import mmap
+import struct
+
+import numpy as np
+
+MAGIC = b"NDPIPE\x00\x00"
+FORMAT_VERSION = 1
+_ALIGNMENT = 8
+
+
+def _encode_strings(strings: list[str]):
+    """Joins strings into one UTF-8 byte array plus the character offsets of every string in the joined text."""
+    offsets = np.zeros(len(strings) + 1, dtype="<i4")
+    np.cumsum([len(s) for s in strings], out=offsets[1:])
+    return np.frombuffer("".join(strings).encode("utf-8"), dtype=np.uint8), offsets
+
+
+def _decode_strings(text_bytes: np.ndarray, offsets: np.ndarray) -> list[str]:
+    text = text_bytes.tobytes().decode("utf-8")
+    bounds = offsets.tolist()
+    return [text[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def save_inference_checkpoint(filename: str, config: dict, arrays: "dict[str, np.ndarray|list[str]]"):
+    """
+    Write a compact checkpoint.
+
+    :param filename: The name of the file to write.
+    :param config: JSON-serializable configuration stored in the header.
+    :param arrays: Named arrays, string lists are stored with their offsets.
+    """
+    encoded: dict[str, np.ndarray] = {}
+    for name, array in arrays.items():
+        if isinstance(array, list):
+            encoded[f"{name}.chars"], encoded[f"{name}.offsets"] = _encode_strings(array)
+        else:
+            encoded[name] = np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder("<"))
+
+    entries = {}
+    offset = 0
+    for name, array in encoded.items():
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+    header = json.dumps({"version": FORMAT_VERSION, "config": config, "arrays": entries}).encode()
+    data_start = -(-(len(MAGIC) + 4 + len(header)) // _ALIGNMENT) * _ALIGNMENT
+
+    with open(filename, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(b"\x00" * (data_start - f.tell()))
+        for name, array in encoded.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(array.tobytes())
+        # Pad the last array, so every array can be viewed in a memory map
+        f.write(b"\x00" * (-f.tell() % _ALIGNMENT))
+
+
+def is_inference_checkpoint(filename: str) -> bool:
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_inference_checkpoint(filename: str, use_mmap: bool = True):
+    """
+    Read a compact checkpoint.
+
+    :param filename: The name of the file to read.
+    :param use_mmap: Memory-map the file instead of reading it into memory. Only the numeric arrays are views of
+        the map, decoded string lists are copies.
+    :return: A tuple of two items - the config and a dict of arrays, with string lists decoded.
+    """
+    with open(filename, "rb") as f:
+        buffer: "mmap.mmap|bytes" = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if use_mmap else f.read()
+
+    if buffer[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{filename} is not an inference checkpoint")
+    (header_size,) = struct.unpack_from("<I", buffer, len(MAGIC))
+    header_start = len(MAGIC) + 4
+    header = json.loads(bytes(buffer[header_start : header_start + header_size]))
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported inference checkpoint version {header['version']}, expected {FORMAT_VERSION}. "
+            "Re-export it with TextPipeline.export_inference."
+        )
+    data_start = -(-(header_start + header_size) // _ALIGNMENT) * _ALIGNMENT
+
+    raw: dict[str, np.ndarray] = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + entry["offset"])
+        raw[name] = array.reshape(entry["shape"])
+
+    arrays: "dict[str, np.ndarray|list[str]]" = {}
+    for name in [name[: -len(".chars")] for name in raw if name.endswith(".chars")]:
+        arrays[name] = _decode_strings(raw.pop(f"{name}.chars"), raw.pop(f"{name}.offsets"))
+    arrays.update(raw)
+
+    return header["config"], arrays
@@ -0,0 +1,117 @@
+"""
+Quality vs. latency trade-off of compacted CatBoost models, see ``CatBoostModel.compact``.
+"""
+
+import argparse
+import time
+from typing import Iterable
+
+import numpy as np
+
+from name_detector.model import CatBoostModel
+from name_detector.pipeline import TextPipeline
+
+
+def evaluate_compaction(
+    pipeline: TextPipeline,
+    models: dict[str, CatBoostModel],
+    positive_texts: Iterable[str],
+    negative_texts: Iterable[str],
+    threshold: float = 0.5,
+    batch_sizes: Iterable[int] = (1, 64, 1024),
+    repeat: int = 5,
+) -> dict[str, dict]:
+    """
+    Scores labeled texts with every model and measures the model's latency per call for a range of batch sizes.
+
+    Quality is measured on the first window of every text (``TextPipeline.first_windows``), featurized once for all
+    models. Latency covers only the model call on the first ``batch_size`` of those windows, not featurization, which
+    is the same for every model apart from the columns it reads.
+
+    :param pipeline: The pipeline the models were trained on, without selected columns.
+    :param models: Models by name, e.g. the full checkpoint and compacted copies of it.
+    :param positive_texts: Texts containing a name, e.g. the positive test examples of ``prepare_data``.
+    :param negative_texts: Texts without a name, e.g. the negative test examples of ``prepare_data``.
+    :param threshold: The probability above which a window counts as a detected name.
+    :param batch_sizes: The numbers of windows scored with one call.
+    :param repeat: Calls per batch size, the fastest one is reported.
+    :return: Per model, its trees and columns, AUC, recall and precision, and milliseconds per call per batch size.
+    """
+    from sklearn.metrics import precision_score, recall_score, roc_auc_score
+
+    assert pipeline.columns is None, "the pipeline must produce all columns"
+    positive_windows = pipeline.tokenize_windows(pipeline.first_windows(positive_texts))
+    negative_windows = pipeline.tokenize_windows(pipeline.first_windows(negative_texts))
+    y_true = np.array([1] * len(positive_windows) + [0] * len(negative_windows))
+    X_full = pipeline.featurize(positive_windows + negative_windows)
+
+    results = {}
+    for name, model in models.items():
+        X_input = X_full if model.columns is None else X_full[:, model.columns]
+        y_prob = model.predict_proba(X_input)[:, 1]
+        latency_ms = {}
+        for batch_size in batch_sizes:
+            batch = X_input[:batch_size]
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                model.predict_proba(batch)
+                timings.append(time.perf_counter() - start)
+            latency_ms[batch_size] = min(timings) * 1000
+        results[name] = {
+            "trees": model.tree_count,
+            "columns": X_input.shape[1],
+            "auc": roc_auc_score(y_true, y_prob),
+            "recall": recall_score(y_true, y_prob > threshold),
+            "precision": precision_score(y_true, y_prob > threshold, zero_division=0),
+            "latency_ms": latency_ms,
+        }
+    return results
+
+
+def main():
+    from name_detector.detect_names import CHECKPOINTS_DIR
+    from name_detector.pipeline import add_data_arguments, data_config, prepare_data
+
+    parser = argparse.ArgumentParser(description="Compare compacted models with the full checkpoint on the test set.")
+    add_data_arguments(parser)
+    parser.add_argument("--model", default=f"{CHECKPOINTS_DIR}/catboost_model.cbm", help="The model to compact.")
+    parser.add_argument("--pipeline", default=f"{CHECKPOINTS_DIR}/pipeline_inference.bin")
+    parser.add_argument("--tree-counts", type=int, nargs="+", default=[150, 100, 75, 50], help="Tree caps to compare.")
+    parser.add_argument("--output", help="Save the model compacted to --ntree-end trees to this path.")
+    parser.add_argument("--ntree-end", type=int, help="Tree cap of the saved model, all trees by default.")
+    args = parser.parse_args()
+
+    _, positive_test_examples, _, negative_test_examples = prepare_data(data_config(args))
+
+    model = CatBoostModel.init_from(args.model)
+    models = {"full": model, "compact": model.compact()}
+    for ntree_end in args.tree_counts:
+        if ntree_end < model.tree_count:
+            models[f"compact_{ntree_end}"] = model.compact(ntree_end)
+    results = evaluate_compaction(
+        TextPipeline.init_from(args.pipeline),
+        models,
+        positive_test_examples,
+        negative_test_examples,
+        threshold=args.threshold,
+    )
+
+    batch_sizes = list(next(iter(results.values()))["latency_ms"])
+    print(
+        f"{'model':14s} {'trees':>6s} {'columns':>8s} {'auc':>8s} {'recall':>7s} {'precision':>9s} "
+        + " ".join(f"{f'ms@{batch_size}':>9s}" for batch_size in batch_sizes)
+    )
+    for name, values in results.items():
+        print(
+            f"{name:14s} {values['trees']:6d} {values['columns']:8d} {values['auc']:8.5f} {values['recall']:7.4f} "
+            f"{values['precision']:9.4f} " + " ".join(f"{ms:9.3f}" for ms in values["latency_ms"].values())
+        )
+
+    if args.output:
+        model.compact(args.ntree_end).save(args.output)
+        print(f"Compacted model saved at: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
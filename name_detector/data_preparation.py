@@ -4,12 +4,22 @@ from name_detector.utils import is_cyrillic, latinize_text
 
 
 class WordFilter:
+    word_pattern = re.compile(r"\w+")
+
     def __init__(self):
         self.non_word_pattern = re.compile(r"\W+")
 
     def filter(self, text):
         return re.sub(self.non_word_pattern, " ", text).strip()
 
+    def word_spans(self, text: str) -> list[tuple[int, int]]:
+        """
+        Tokenizes text in a single regex pass. The words are the same as those of ``filter(text).split()``.
+
+        :return: ``(start, end)`` character offsets of the words in ``text``.
+        """
+        return [match.span() for match in self.word_pattern.finditer(text)]
+
 
 class OneToManyAugmenter:
     def _augment(self, text: str, label=None) -> "tuple[list, list] | list":
@@ -72,47 +82,58 @@ class WordSampler:
             sampled_texts = [" ".join(words[:3])]
             sampled_labels = [label]
         else:
-            # sampled_texts = [' '.join(words[i:i+n]) for n in range(2, 4) for i in range(len(words)-n+1)]
-            sampled_texts = [
-                " ".join(words[i : i + n]) for i in range(len(words)) for n in range(2, 4) if i + n <= len(words)
-            ]
+            sampled_texts = [" ".join(words[start:end]) for start, end in self.window_ranges(len(words))]
             sampled_labels = [label] * len(sampled_texts)
         return (sampled_texts, sampled_labels) if label is not None else sampled_texts
 
+    def window_ranges(self, n_words: int) -> list[tuple[int, int]]:
+        """
+        :return: ``(start, end)`` word indices of all 2-3 word combinations, in the order of ``sample``.
+        """
+        return [(i, i + n) for i in range(n_words) for n in range(2, 4) if i + n <= n_words]
+
+
+# Mapping of Tajik-specific Cyrillic letters to Russian equivalents
+# This example includes a few letters - you may need to expand this based on specific requirements
+_tajik_to_russian_table = str.maketrans(
+    {
+        "ӣ": "и",
+        "ӯ": "у",
+        "Ӯ": "У",
+        "ҳ": "х",
+        "Ҳ": "Х",
+        "қ": "к",
+        "Қ": "К",
+        "ғ": "г",
+        "Ғ": "Г",
+        "ҷ": "ч",
+        "Ҷ": "Ч",
+    }
+)
+
+
+def normalize_cyrillic(text: str) -> str:
+    """
+    Normalize Tajik-specific Cyrillic letters to Russian versions.
+
+    :param text: The text to be normalized.
+    :return: Normalized text.
+    """
+    if not isinstance(text, str):
+        raise TypeError(f"text must be a string, not {type(text).__name__}")
+    return text.translate(_tajik_to_russian_table)
+
 
 class Preprocessor:
     def normalize_cyrillic(self, text):
         """
-        Normalize Tajik-specific Cyrillic letters to Russian versions.
-
-        :param text: The text to be normalized.
-        :return: Normalized text.
+        Normalize Tajik-specific Cyrillic letters to Russian versions, see ``normalize_cyrillic``.
         """
-        # Mapping of Tajik-specific Cyrillic letters to Russian equivalents
-        # This example includes a few letters - you may need to expand this based on specific requirements
-        tajik_to_russian = {
-            "ӣ": "и",
-            "ӯ": "у",
-            "Ӯ": "У",
-            "ҳ": "х",
-            "Ҳ": "Х",
-            "қ": "к",
-            "Қ": "К",
-            "ғ": "г",
-            "Ғ": "Г",
-            "ҷ": "ч",
-            "Ҷ": "Ч",
-        }
-
-        # Replace each Tajik-specific letter with its Russian equivalent
-        for tajik_letter, russian_letter in tajik_to_russian.items():
-            text = text.replace(tajik_letter, russian_letter)
-
-        return text
+        return normalize_cyrillic(text)
 
     def tokenize(self, text: str):
         return text.split()
 
     def preprocess(self, text: str):
-        text = self.normalize_cyrillic(text)
+        text = normalize_cyrillic(text)
         return self.tokenize(text)
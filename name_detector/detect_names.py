@@ -1,41 +1,512 @@
+import argparse
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
 import sys
+import threading
+from collections import deque
+from itertools import islice
+from typing import IO, Callable, Iterable, Iterator, cast
 
-import pkg_resources  # type: ignore
+import numpy as np
 
+from name_detector.cache import LRUCache
 from name_detector.model import CatBoostModel
 from name_detector.pipeline import TextPipeline
+from name_detector.prefilter import WindowPrefilter
+
+CHECKPOINTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+
+# Reason code of windows rejected by the first stage of a cascade
+REASON_FIRST_STAGE = "first_stage"
 
 
 class NameDetector:
-    __pipeline_path = pkg_resources.resource_filename("name_detector", "checkpoints/pipeline.joblib")
-    __model_path = pkg_resources.resource_filename("name_detector", "checkpoints/catboost_model.cbm")
+    # Compact export of checkpoints/pipeline.joblib, see TextPipeline.export_inference
+    __pipeline_path = os.path.join(CHECKPOINTS_DIR, "pipeline_inference.bin")
+    # catboost_model.cbm reading only the feature columns it uses, see CatBoostModel.compact
+    __model_path = os.path.join(CHECKPOINTS_DIR, "catboost_model_inference.cbm")
 
-    def __init__(self):
+    FEATURE_FORMATS = ("sparse", "dense", "pool")
+
+    def __init__(
+        self,
+        token_cache_size: "int|None" = None,
+        feature_format: str = "sparse",
+        prefilter: bool = False,
+        window_cache_size: "int|None" = None,
+        first_stage: "str|None" = None,
+        first_stage_threshold: "float|None" = None,
+    ):
+        """
+        :param token_cache_size: If set, cache features of up to this many distinct tokens across calls.
+            Counters are available from ``self.pipeline.token_cache_stats()``.
+        :param feature_format: How window features are passed to CatBoost: a scipy CSR matrix (``"sparse"``), a
+            Fortran-ordered float32 array written into a reusable per-thread buffer (``"dense"``), or a
+            ``catboost.Pool`` built from that array (``"pool"``). See ``benchmarks/feature_format.py`` to choose per
+            workload.
+        :param prefilter: Skip windows that cannot contain a name before scoring them, see ``WindowPrefilter``.
+            Skipped windows get probability 0.
+        :param window_cache_size: If set, remember the probabilities of up to this many distinct normalized windows
+            across calls, so recurring windows are neither featurized nor scored again. The cache is cleared when
+            ``self.pipeline`` or ``self.model`` is replaced. Counters are available from ``window_cache_stats()``.
+        :param first_stage: Path of a first-stage model trained with ``train_first_stage``. It scores every window
+            from its name features alone, and only windows scoring at least ``first_stage_threshold`` are featurized
+            and scored by the full model. The others get probability 0.
+        :param first_stage_threshold: The first-stage threshold, by default the one stored with the model.
+        """
+        if feature_format not in self.FEATURE_FORMATS:
+            raise ValueError(f"Unknown feature format: {feature_format}, expected one of {self.FEATURE_FORMATS}")
+        self.token_cache_size = token_cache_size
+        self.feature_format = feature_format
         self.pipeline = TextPipeline.init_from(self.__pipeline_path)
         self.model = CatBoostModel.init_from(self.__model_path)
+        if token_cache_size:
+            self.pipeline.enable_token_cache(token_cache_size)
+        self.pipeline.select_columns(self.model.columns)
+        self._buffers = _FeatureBuffers(self.pipeline.n_features)
+        self.prefilter = WindowPrefilter(self.pipeline.name_featurizer) if prefilter else None
+        self.window_cache_size = window_cache_size
+        self.window_cache = LRUCache(window_cache_size) if window_cache_size else None
+        # The checkpoints the cached probabilities were computed with
+        self._window_cache_checkpoints = (self.pipeline, self.model)
+        self.first_stage_path = first_stage
+        self.first_stage = CatBoostModel.init_from(first_stage) if first_stage else None
+        if self.first_stage is not None and first_stage_threshold is None:
+            first_stage_threshold = float(self.first_stage.get_metadata().get("first_stage_threshold", 0.0))
+        self.first_stage_threshold = first_stage_threshold
 
-    def predict(self, text):
+    def predict(self, text, return_spans: bool = False, return_reasons: bool = False):
+        """
+        :param return_spans: Also return the ``(start, end)`` character offsets of every window in ``text``.
+        :param return_reasons: Also return the reason code of every window skipped by the prefilter or the first
+            stage, None for scored windows.
+        :return: A tuple of windows and their probabilities, followed by the list of spans and the list of reason
+            codes if requested.
+        """
         # window all two and three consecutive word tuples
-        windows = self.pipeline.get_windows(text)
-        if not windows:
-            return [], []
-        X_input, _ = self.pipeline.transform(windows)
-        y_prob = self.model.predict_proba(X_input)
-        return windows, y_prob[:, 1]
+        windows, spans, tokenized = self.pipeline.get_window_spans(text, return_tokens=True)
+        if windows:
+            y_prob, reasons = self._predict_windows(windows, tokenized)
+        else:
+            y_prob, reasons = np.zeros(0), []
+        return (windows, y_prob) + ((spans,) if return_spans else ()) + ((reasons,) if return_reasons else ())
+
+    def predict_batch(self, texts: list[str], return_spans: bool = False, return_reasons: bool = False):
+        """
+        Predicts probabilities for the windows of many texts with a single model call.
+
+        :param texts: The input text strings.
+        :param return_spans: Also return per-text lists of ``(start, end)`` character offsets of the windows.
+        :param return_reasons: Also return per-text lists of reason codes of skipped windows, None for scored windows.
+        :return: A tuple of three items - per-text lists of windows, per-text arrays of probabilities and
+            offsets of length ``len(texts) + 1``, so that rows ``offsets[i]:offsets[i + 1]`` of the batch
+            belong to ``texts[i]``. Per-text lists of spans and of reason codes follow if requested.
+        """
+        window_spans = [self.pipeline.get_window_spans(text, return_tokens=True) for text in texts]
+        windows = [text_windows for text_windows, _, _ in window_spans]
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(text_windows) for text_windows in windows], out=offsets[1:])
+
+        flat_windows = [window for text_windows in windows for window in text_windows]
+        flat_tokenized = [tokens for _, _, tokenized in window_spans for tokens in tokenized]
+        y_prob, reasons = self._predict_windows(flat_windows, flat_tokenized) if flat_windows else (np.zeros(0), [])
+
+        probabilities = [y_prob[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        result: tuple = (windows, probabilities, offsets)
+        if return_spans:
+            result += ([text_spans for _, text_spans, _ in window_spans],)
+        if return_reasons:
+            result += ([reasons[start:end] for start, end in zip(offsets[:-1], offsets[1:])],)
+        return result
+
+    def extract(self, text: str, threshold: float = 0.5) -> list[tuple]:
+        """
+        Finds names in a text: windows scored above ``threshold`` are merged where they overlap or touch.
+
+        :param text: The input text string.
+        :param threshold: The probability above which a window is taken as a name.
+        :return: A list of ``(name, start, end, probability)`` tuples in text order, where ``name`` is
+            ``text[start:end]`` and ``probability`` is the highest among the merged windows.
+        """
+        return self.extract_batch([text], threshold)[0]
+
+    def extract_batch(self, texts: list[str], threshold: float = 0.5) -> list[list[tuple]]:
+        """
+        Runs ``extract`` on many texts with a single model call.
+
+        :return: Per-text lists of ``(name, start, end, probability)`` tuples.
+        """
+        _, probabilities, _, spans = self.predict_batch(texts, return_spans=True)
+        return [
+            [
+                (text[start:end], start, end, probability)
+                for start, end, probability in merge_spans(text_spans, text_probabilities, threshold)
+            ]
+            for text, text_spans, text_probabilities in zip(texts, spans, probabilities)
+        ]
+
+    def redact(self, text: str, threshold: float = 0.5, mask: "str|Callable[[str], str]" = "[NAME]") -> str:
+        """
+        Replaces the names found by ``extract`` in a text.
+
+        :param text: The input text string.
+        :param threshold: The probability above which a window is taken as a name.
+        :param mask: The replacement of every name, or a function mapping a name to its replacement, e.g.
+            ``lambda name: "*" * len(name)`` to keep the text length.
+        :return: The redacted text.
+        """
+        return self.redact_batch([text], threshold, mask)[0]
+
+    def redact_batch(
+        self, texts: list[str], threshold: float = 0.5, mask: "str|Callable[[str], str]" = "[NAME]"
+    ) -> list[str]:
+        """
+        Runs ``redact`` on many texts with a single model call.
+        """
+        redacted = []
+        for text, names in zip(texts, self.extract_batch(texts, threshold)):
+            pieces, position = [], 0
+            for name, start, end, _ in names:
+                pieces += [text[position:start], mask(name) if callable(mask) else mask]
+                position = end
+            pieces.append(text[position:])
+            redacted.append("".join(pieces))
+        return redacted
+
+    def featurize_windows(self, windows: list[str]):
+        """
+        :param windows: Windows as returned by ``TextPipeline.get_windows``.
+        :return: The model input for ``windows`` in the detector's ``feature_format``.
+        """
+        return self.featurize_tokenized(self.pipeline.tokenize_windows(windows))
+
+    def featurize_tokenized(self, tokenized_windows: list[list[str]]):
+        """
+        :param tokenized_windows: Windows as returned by ``TextPipeline.tokenize``.
+        :return: The model input for ``tokenized_windows`` in the detector's ``feature_format``.
+        """
+        if self.feature_format == "sparse":
+            return self.pipeline.featurize(tokenized_windows)
+
+        X_input = self.pipeline.featurize(tokenized_windows, out=self._buffers.get(len(tokenized_windows)))
+        if self.feature_format == "pool":
+            X_input = self.model.pool(X_input)
+        return X_input
+
+    def window_cache_stats(self) -> "dict|None":
+        """
+        :return: Hit, miss and eviction counters of the window cache, or None if it is disabled.
+        """
+        return self.window_cache.stats() if self.window_cache is not None else None
+
+    def _predict_windows(self, windows: list[str], tokenized_windows: list[list[str]]) -> tuple[np.ndarray, list]:
+        instrumentation = self.pipeline.instrumentation
+        if self.prefilter is None:
+            reasons: list = [None] * len(windows)
+        else:
+            start = instrumentation.start() if instrumentation else 0.0
+            reasons = self.prefilter.window_reasons(windows)
+            if instrumentation:
+                instrumentation.record("prefilter", start, len(windows))
+        kept = [i for i, reason in enumerate(reasons) if reason is None]
+        y_prob = np.zeros(len(windows))
+        if not kept:
+            return y_prob, reasons
+
+        tokenized = tokenized_windows if len(kept) == len(windows) else [tokenized_windows[i] for i in kept]
+        if self.first_stage is not None:
+            passed = self.first_stage_passed(tokenized)
+            for i in np.flatnonzero(~passed):
+                reasons[kept[i]] = REASON_FIRST_STAGE
+            kept = [i for i, window_passed in zip(kept, passed) if window_passed]
+            tokenized = [tokens for tokens, window_passed in zip(tokenized, passed) if window_passed]
+            if not kept:
+                return y_prob, reasons
+
+        y_prob[kept] = self.score_tokenized(tokenized)
+        return y_prob, reasons
+
+    def first_stage_passed(self, tokenized_windows: list[list[str]]) -> np.ndarray:
+        """
+        :param tokenized_windows: Windows as returned by ``TextPipeline.tokenize``.
+        :return: A boolean mask of the windows the first stage passes on to the full model.
+        """
+        X_input = self.pipeline.featurize_names(tokenized_windows)
+        instrumentation = self.pipeline.instrumentation
+        start = instrumentation.start() if instrumentation else 0.0
+        passed = cast(CatBoostModel, self.first_stage).predict_proba(X_input)[:, 1] >= self.first_stage_threshold
+        if instrumentation:
+            instrumentation.record("first_stage", start, len(tokenized_windows))
+        return passed
+
+    def score_tokenized(self, tokenized_windows: list[list[str]]) -> np.ndarray:
+        """
+        Scores windows with the full model, through the window cache if it is enabled. Neither the prefilter nor the
+        first stage is applied.
+
+        :param tokenized_windows: Windows as returned by ``TextPipeline.tokenize``.
+        :return: The probabilities of the windows.
+        """
+        if self.window_cache is None:
+            return self._score(tokenized_windows)
+        return self._score_cached(tokenized_windows)
+
+    def _score(self, tokenized_windows: list[list[str]]) -> np.ndarray:
+        X_input = self.featurize_tokenized(tokenized_windows)
+        instrumentation = self.pipeline.instrumentation
+        start = instrumentation.start() if instrumentation else 0.0
+        y_prob = self.model.predict_proba(X_input)[:, 1]
+        if instrumentation:
+            instrumentation.record("CatBoost", start, len(tokenized_windows))
+        return y_prob
+
+    def _score_cached(self, tokenized_windows: list[list[str]]) -> np.ndarray:
+        cache = cast(LRUCache, self.window_cache)
+        checkpoints = (self.pipeline, self.model)
+        if any(current is not cached for current, cached in zip(checkpoints, self._window_cache_checkpoints)):
+            cache.clear()
+            self._window_cache_checkpoints = checkpoints
+
+        # The normalized tokens determine the features, so windows differing only in normalization share an entry
+        keys = [tuple(tokens) for tokens in tokenized_windows]
+        y_prob = np.array([cache.get(key, -1.0) for key in keys])
+        missed = np.flatnonzero(y_prob < 0)
+        if len(missed):
+            distinct = list(dict.fromkeys(keys[i] for i in missed))
+            scores = dict(zip(distinct, self._score([list(key) for key in distinct])))
+            for key, probability in scores.items():
+                cache.put(key, probability)
+            y_prob[missed] = [scores[keys[i]] for i in missed]
+        return y_prob
+
+    def scan_parallel(
+        self, texts: Iterable[str], workers: "int|None" = None, chunksize: int = 256, prefetch: int = 2
+    ) -> Iterator[tuple]:
+        """
+        Scans a stream of texts with a pool of worker processes.
+
+        Workers are started with forkserver where the platform supports it and with spawn otherwise, and each loads
+        the checkpoints once at startup with the options of this detector. Texts are sent to the workers in chunks that
+        are scored with ``predict_batch``, and at most ``workers * prefetch`` chunks are in flight, so memory stays
+        bounded however long the input is.
+
+        :param texts: An iterable of input text strings, consumed lazily.
+        :param workers: The number of worker processes, defaults to the number of CPUs.
+        :param chunksize: The number of texts scored by a worker in one batch.
+        :param prefetch: The number of chunks queued per worker.
+        :return: An iterator of ``(windows, probabilities)`` tuples, one per text, in input order.
+        """
+        workers = workers or os.cpu_count() or 1
+        # Forked workers would inherit the locks of the caches in whatever state other threads hold them, so every
+        # worker loads its own detector in a fresh interpreter instead
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        initargs = (
+            self.token_cache_size,
+            self.feature_format,
+            self.prefilter is not None,
+            self.window_cache_size,
+            self.first_stage_path,
+            self.first_stage_threshold,
+        )
+
+        chunks = _chunked(texts, chunksize)
+        with context.Pool(workers, initializer=_load_worker_detector, initargs=initargs) as pool:
+            pending: deque = deque(
+                pool.apply_async(_scan_chunk, (chunk,)) for chunk in islice(chunks, workers * prefetch)
+            )
+            while pending:
+                results = pending.popleft().get()
+                for chunk in islice(chunks, 1):
+                    pending.append(pool.apply_async(_scan_chunk, (chunk,)))
+                yield from results
+
+
+# Detector of a scan_parallel worker process, set only inside the worker
+_worker_detector: "NameDetector|None" = None
+
+
+def _load_worker_detector(
+    token_cache_size, feature_format, prefilter, window_cache_size, first_stage, first_stage_threshold
+):
+    global _worker_detector
+    _worker_detector = NameDetector(
+        token_cache_size=token_cache_size,
+        feature_format=feature_format,
+        prefilter=prefilter,
+        window_cache_size=window_cache_size,
+        first_stage=first_stage,
+        first_stage_threshold=first_stage_threshold,
+    )
+
+
+class _FeatureBuffers(threading.local):
+    """
+    Dense float32 feature buffers of the most recent batch sizes, kept per thread so that concurrent predictions
+    never share a buffer.
+    """
+
+    def __init__(self, n_features: int, maxsize: int = 4):
+        self.n_features = n_features
+        self.buffers = LRUCache(maxsize)
+
+    def get(self, n_rows: int) -> np.ndarray:
+        buffer = self.buffers.get(n_rows)
+        if buffer is None:
+            buffer = np.empty((n_rows, self.n_features), dtype=np.float32, order="F")
+            self.buffers.put(n_rows, buffer)
+        # CatBoost marks the arrays it reads as read-only, the previous batch is done with it by now
+        buffer.setflags(write=True)
+        return buffer
+
+
+def _scan_chunk(texts: list[str]):
+    assert _worker_detector is not None
+    windows, probabilities, _ = _worker_detector.predict_batch(texts)
+    return list(zip(windows, probabilities))
+
+
+def merge_spans(spans: list[tuple[int, int]], probabilities, threshold: float = 0.5) -> list[tuple[int, int, float]]:
+    """
+    Merges the spans of windows scored above ``threshold`` where they overlap or touch, in a single pass.
+
+    :param spans: ``(start, end)`` window spans sorted by start, as returned by ``TextPipeline.get_window_spans``.
+    :param probabilities: The probabilities of the windows.
+    :param threshold: The probability above which a window is kept.
+    :return: A list of ``(start, end, probability)`` tuples of the merged spans, with the highest probability of
+        their windows.
+    """
+    merged: list[tuple[int, int, float]] = []
+    for (start, end), probability in zip(spans, probabilities):
+        if probability <= threshold:
+            continue
+        probability = float(probability)
+        if merged and start <= merged[-1][1]:
+            last_start, last_end, last_probability = merged[-1]
+            merged[-1] = (last_start, max(last_end, end), max(last_probability, probability))
+        else:
+            merged.append((start, end, probability))
+    return merged
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _read_records(stream: IO[str], input_format: str, field: str, id_field: "str|None") -> Iterator[tuple]:
+    """
+    Yields ``(record_id, text)`` for every record of a text, CSV or JSONL stream. Malformed JSONL records are skipped
+    with a warning on stderr, so one bad line does not stop the stream.
+    """
+    if input_format == "text":
+        for index, line in enumerate(stream):
+            yield index, line.rstrip("\r\n")
+    elif input_format == "csv":
+        for index, row in enumerate(csv.DictReader(stream)):
+            yield row[id_field] if id_field else index, row[field] or ""
+    elif input_format == "jsonl":
+        for index, line in enumerate(line for line in stream if line.strip()):
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                _skip_record(index, f"invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                _skip_record(index, "not a JSON object")
+                continue
+            missing = [key for key in (field, id_field) if key and key not in record]
+            if missing:
+                _skip_record(index, f"missing field {missing[0]!r}")
+                continue
+            text = record[field]
+            if text is not None and not isinstance(text, str):
+                _skip_record(index, f"field {field!r} is a {type(text).__name__}, not a string")
+                continue
+            yield record[id_field] if id_field else index, text or ""
+    else:
+        raise ValueError(f"Unknown input format: {input_format}")
+
+
+def _skip_record(index: int, reason: str):
+    print(f"Skipping record {index}: {reason}", file=sys.stderr)
+
+
+def scan_records(name_detector: NameDetector, records: Iterable[tuple], output: IO[str], batch_size: int = 256):
+    """
+    Scores ``(record_id, text)`` records in micro-batches and writes one JSON line per record.
+
+    Only one batch is held in memory at a time, so input of any size can be streamed. If the detector has a
+    prefilter or a first stage, the reason codes of skipped windows are written under ``skip_reasons``.
+
+    :param name_detector: The detector to score the texts with.
+    :param records: An iterable of ``(record_id, text)`` tuples, consumed lazily.
+    :param output: A text stream the JSON lines are written to.
+    :param batch_size: The number of records scored with one model call.
+    """
+    for batch in _chunked(records, batch_size):
+        record_ids, texts = zip(*batch)
+        windows, probabilities, _, spans, reasons = name_detector.predict_batch(
+            list(texts), return_spans=True, return_reasons=True
+        )
+        for record_id, text_windows, text_probabilities, text_spans, text_reasons in zip(
+            record_ids, windows, probabilities, spans, reasons
+        ):
+            result = {
+                "id": record_id,
+                "windows": text_windows,
+                "probabilities": [float(probability) for probability in text_probabilities],
+                "spans": text_spans,
+            }
+            if name_detector.prefilter is not None or name_detector.first_stage is not None:
+                result["skip_reasons"] = text_reasons
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def _open(path: str, mode: str) -> contextlib.AbstractContextManager:
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin if mode == "r" else sys.stdout)
+    return open(path, mode, encoding="utf-8", newline="")
+
 
+def main(argv: "list[str]|None" = None):
+    parser = argparse.ArgumentParser(
+        description="Detect Tajik full names. Scores a single text, or streams records and writes JSON lines."
+    )
+    parser.add_argument("text", nargs="?", help="A text to scan. Omit it to stream records from --input.")
+    parser.add_argument("-i", "--input", help="File to stream records from, '-' for stdin (default).")
+    parser.add_argument("-o", "--output", default="-", help="File to write JSON lines to, '-' for stdout (default).")
+    parser.add_argument("-f", "--format", choices=["text", "csv", "jsonl"], default="text", help="Input format.")
+    parser.add_argument("--field", default="text", help="CSV column or JSONL key holding the text.")
+    parser.add_argument("--id-field", help="CSV column or JSONL key copied to the output id, record number by default.")
+    parser.add_argument("-b", "--batch-size", type=int, default=256, help="Records scored with one model call.")
+    parser.add_argument(
+        "--prefilter", action="store_true", help="Skip windows that cannot contain a name, scoring them 0."
+    )
+    parser.add_argument("--first-stage", help="First-stage model of a cascade, see train_first_stage.")
+    args = parser.parse_args(argv)
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python name_detector_script.py <text>")
+    if args.text is not None and args.input is not None:
+        parser.error("pass either a text or --input, not both")
+    if args.text is None and args.input is None and sys.stdin.isatty():
+        parser.print_usage()
         sys.exit(1)
 
-    text = sys.argv[1]
+    name_detector = NameDetector(prefilter=args.prefilter, first_stage=args.first_stage)
 
-    name_detector = NameDetector()
-    windows, y_prob = name_detector.predict(text)
+    if args.text is not None:
+        windows, y_prob = name_detector.predict(args.text)
+        for window, prob in zip(windows, y_prob):
+            print(f"{window:30s}  {prob:.3f}")
+        return
 
-    for window, prob in zip(windows, y_prob):
-        print(f"{window:30s}  {prob:.3f}")
+    with _open(args.input or "-", "r") as input_stream, _open(args.output, "w") as output:
+        records = _read_records(input_stream, args.format, args.field, args.id_field)
+        scan_records(name_detector, records, output, batch_size=args.batch_size)
 
 
 if __name__ == "__main__":
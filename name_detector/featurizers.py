@@ -1,14 +1,119 @@
+import re
+from typing import Iterable, Iterator
+
 import numpy as np
 from scipy.sparse import csr_matrix
-from sklearn.feature_extraction.text import CountVectorizer
 
+from name_detector.cache import LRUCache
 from name_detector.data_preparation import Preprocessor, WordFilter
 
+_TERMINAL = ""
+
+
+def build_prefix_automaton(words) -> dict:
+    """
+    Compiles words into a minimized prefix automaton (DAWG) of nested dicts.
+
+    Every node maps a character to the next node and contains the ``""`` key if the path to it spells a word.
+    Identical subtrees are shared, which keeps the automaton several times smaller than a plain trie.
+
+    :param words: The words to compile.
+    :return: The root node.
+    """
+    root: dict = {}
+    # Sorted insertion keeps the children of every node in a canonical order, see the registry key below
+    for word in sorted(words):
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[_TERMINAL] = True
+
+    registry: dict = {}
+
+    def minimize(node):
+        for char, child in node.items():
+            if char != _TERMINAL:
+                node[char] = minimize(child)
+        key = tuple((char, child if char == _TERMINAL else id(child)) for char, child in node.items())
+        return registry.setdefault(key, node)
+
+    return minimize(root)
+
+
+def automaton_words(root: dict) -> Iterator[str]:
+    """Enumerates the words of a prefix automaton."""
+    stack = [("", root)]
+    while stack:
+        prefix, node = stack.pop()
+        for char, child in node.items():
+            if char == _TERMINAL:
+                yield prefix
+            else:
+                stack.append((prefix + char, child))
+
+
+def walk_automaton(root: dict, word: str) -> Iterator[tuple[int, dict]]:
+    """Yields ``(size, node)`` for every prefix of ``word`` that a word of the automaton starts with, shortest first."""
+    node = root
+    for size, char in enumerate(word, start=1):
+        next_node = node.get(char)
+        if next_node is None:
+            return
+        node = next_node
+        yield size, node
+
+
+def automaton_to_arrays(root: dict) -> dict[str, np.ndarray]:
+    """
+    Flattens a prefix automaton into arrays, for storing it in a checkpoint.
+
+    Node 0 is the root. Edges of node ``i`` are ``edge_start[i]:edge_start[i + 1]``, each with a code point label
+    and a target node.
+    """
+    node_ids = {id(root): 0}
+    nodes = [root]
+    for node in nodes:
+        for char, child in node.items():
+            if char != _TERMINAL and id(child) not in node_ids:
+                node_ids[id(child)] = len(nodes)
+                nodes.append(child)
+
+    edge_start = [0]
+    labels = []
+    targets = []
+    for node in nodes:
+        for char, child in node.items():
+            if char != _TERMINAL:
+                labels.append(ord(char))
+                targets.append(node_ids[id(child)])
+        edge_start.append(len(labels))
+
+    return {
+        "edge_start": np.array(edge_start, dtype=np.int32),
+        "labels": np.array(labels, dtype=np.uint16 if max(labels, default=0) <= 0xFFFF else np.uint32),
+        "targets": np.array(targets, dtype=np.int32),
+        "terminal": np.array([_TERMINAL in node for node in nodes], dtype=np.uint8),
+    }
+
+
+def automaton_from_arrays(edge_start: np.ndarray, labels: np.ndarray, targets: np.ndarray, terminal: np.ndarray):
+    """Rebuilds the prefix automaton flattened by ``automaton_to_arrays`` as nested dicts, copying the arrays."""
+    nodes: list[dict] = [{_TERMINAL: True} if is_terminal else {} for is_terminal in terminal.tolist()]
+    chars = [chr(label) for label in labels.tolist()]
+    target_nodes = [nodes[target] for target in targets.tolist()]
+    bounds = edge_start.tolist()
+    for node, start, end in zip(nodes, bounds[:-1], bounds[1:]):
+        node.update(zip(chars[start:end], target_nodes[start:end]))
+    return nodes[0]
+
 
 class NameFeaturizer:
     PAD_TOKEN = ""
     FEATURE_PER_WORD = 4
 
+    # Optional token -> features cache shared across calls, see TextPipeline.enable_token_cache
+    cache: "LRUCache|None" = None
+
     def __init__(self, base_names: list[str]):
         filter = WordFilter()
         self.processor = Preprocessor()
@@ -20,6 +125,48 @@ class NameFeaturizer:
 
         self.base_names = set(base_names)
 
+    @classmethod
+    def from_automaton(cls, automaton: dict):
+        """
+        Create a NameFeaturizer from the compiled prefix automaton of its base names, skipping their preprocessing.
+
+        :param automaton: The prefix automaton, as in ``NameFeaturizer.base_names_automaton``.
+        :return: An instance of NameFeaturizer.
+        """
+        instance = cls.__new__(cls)
+        instance.processor = Preprocessor()
+        instance._base_names_automaton = automaton
+        return instance
+
+    def __getstate__(self):
+        # The cache is runtime state and must not end up in a checkpoint, the automaton is compiled on load
+        state = self.__dict__.copy()
+        state.pop("cache", None)
+        state.pop("_base_names_automaton", None)
+        state["base_names"] = self.base_names
+        return state
+
+    @property
+    def base_names(self) -> set[str]:
+        """Normalized base names. Featurizers created from an automaton enumerate them on first use."""
+        base_names = self.__dict__.get("base_names")
+        if base_names is None:
+            base_names = self.__dict__["base_names"] = set(automaton_words(self._base_names_automaton))
+        return base_names
+
+    @base_names.setter
+    def base_names(self, base_names: set[str]):
+        self.__dict__["base_names"] = base_names
+        self.__dict__.pop("_base_names_automaton", None)
+
+    @property
+    def base_names_automaton(self) -> dict:
+        """Prefix automaton over ``base_names``, compiled on first use."""
+        automaton = self.__dict__.get("_base_names_automaton")
+        if automaton is None:
+            automaton = self._base_names_automaton = build_prefix_automaton(self.base_names)
+        return automaton
+
     def pad_tokens(self, tokens: list[str]):
         if len(tokens) == 3:
             return tokens
@@ -36,35 +183,146 @@ class NameFeaturizer:
         is_title = word.istitle()
         isupper = word.isupper()
         word = word.lower()
-        base_names = self.base_names
         match_count = 0
-        # loop all prefixes
         max_match_size = 0
-        for i in range(2, len(word)):
-            if word[:i] in base_names:
+        # walk all proper prefixes at once, stopping as soon as no base name continues the prefix
+        for size, node in walk_automaton(self.base_names_automaton, word[:-1]):
+            if size >= 2 and _TERMINAL in node:
                 match_count += 1
-                max_match_size = max(max_match_size, i)
+                max_match_size = size
 
         return [match_count, int(is_title), int(isupper), max_match_size]
 
+    def has_base_name_prefix(self, word: str, min_size: int = 2) -> bool:
+        """
+        :param word: A normalized lowercase word.
+        :return: Whether any prefix of ``word`` of at least ``min_size`` characters, the word itself included, is a
+            base name.
+        """
+        return any(
+            size >= min_size and _TERMINAL in node for size, node in walk_automaton(self.base_names_automaton, word)
+        )
+
+    def _featurize_word_cached(self, word: str):
+        if self.cache is None:
+            return self.featurize_word(word)
+        features = self.cache.get(word)
+        if features is None:
+            features = self.featurize_word(word)
+            self.cache.put(word, features)
+        return features
+
+    def transform_tokens(self, words: list[str]):
+        """
+        :return: A ``(len(words), FEATURE_PER_WORD)`` int64 array of word features.
+        """
+        word_features = np.array([self._featurize_word_cached(word) for word in words], dtype=np.int64)
+        return word_features.reshape(-1, self.FEATURE_PER_WORD)
+
     def transform(self, tokenized_texts: list[list[str]]):
-        result = []
+        # Overlapping windows share most of their words, so each distinct word is featurized once.
+        # The padding word is featurized too, which yields its all-zero row.
+        word_ids: dict[str, int] = {}
+        word_index = [
+            word_ids.setdefault(word, len(word_ids))
+            for word_list in tokenized_texts
+            for word in self.pad_tokens(word_list)
+        ]
+        word_features = self.transform_tokens(list(word_ids))
+
+        # Gather window rows and build CSR arrays directly from the nonzero entries
+        features = word_features[word_index].reshape(len(tokenized_texts), 3 * self.FEATURE_PER_WORD)
+        rows, columns = np.nonzero(features)
+        indptr = np.zeros(len(tokenized_texts) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=len(tokenized_texts)), out=indptr[1:])
+        return csr_matrix((features[rows, columns], columns.astype(np.int32), indptr), shape=features.shape)
+
+
+class CharNgramVectorizer:
+    """
+    Inference-only equivalent of a fitted char ``CountVectorizer`` with a fixed vocabulary.
+
+    The vocabulary n-grams are compiled into a trie. Every token is scanned once: from each start position the trie
+    is walked until no vocabulary n-gram continues, so n-grams outside the vocabulary are never materialized.
+    Counts are emitted directly as CSR arrays.
+    """
+
+    _COLUMN = ""
+    _white_spaces = re.compile(r"\s\s+")
 
-        for word_list in tokenized_texts:
-            features = []
-            for word in word_list:
-                features.extend(self.featurize_word(word))
-            if len(word_list) < 3:
-                features += [0, 0, 0, 0] * (3 - len(word_list))
-            result.append(features)
+    def __init__(self, vocabulary: list[str], ngram_range: tuple[int, int], lowercase: bool = True):
+        """
+        :param vocabulary: The n-grams in the order of their feature columns.
+        :param ngram_range: The ``(min_n, max_n)`` range of counted n-gram sizes.
+        :param lowercase: Lowercase tokens before counting, like the ``CountVectorizer`` option.
+        """
+        self.n_features = len(vocabulary)
+        self.min_n, self.max_n = ngram_range
+        self.lowercase = lowercase
 
-        return csr_matrix(result)
+        self.trie: dict = {}
+        for column, ngram in enumerate(vocabulary):
+            # The analyzer never counts n-grams outside of the range, so neither does the trie
+            if not self.min_n <= len(ngram) <= self.max_n:
+                continue
+            node = self.trie
+            for char in ngram:
+                node = node.setdefault(char, {})
+            node[self._COLUMN] = column
+
+    def count(self, token: str) -> dict[int, int]:
+        """
+        :return: Counts of the vocabulary n-grams in ``token``, keyed by feature column.
+        """
+        if self.lowercase:
+            token = token.lower()
+        # Same whitespace normalization as the sklearn char analyzer
+        token = self._white_spaces.sub(" ", token)
+
+        counts: dict[int, int] = {}
+        trie, max_n, column_key = self.trie, self.max_n, self._COLUMN
+        for start in range(len(token) - self.min_n + 1):
+            node = trie
+            for char in token[start : start + max_n]:
+                next_node = node.get(char)
+                if next_node is None:
+                    break
+                node = next_node
+                column = node.get(column_key)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+        return counts
+
+    def transform(self, tokens: list[str]):
+        """
+        :param tokens: The tokens to vectorize.
+        :return: A ``(len(tokens), n_features)`` CSR matrix of n-gram counts.
+        """
+        indptr = [0]
+        indices: list[int] = []
+        data: list[int] = []
+        for token in tokens:
+            for column, count in sorted(self.count(token).items()):
+                indices.append(column)
+                data.append(count)
+            indptr.append(len(indices))
+        return csr_matrix(
+            (np.array(data, dtype=np.int64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(tokens), self.n_features),
+        )
 
 
 class CharFeaturizer:
     PAD_TOKEN = "__"
 
+    # Optional token -> (indices, counts) cache shared across calls, see TextPipeline.enable_token_cache
+    cache: "LRUCache|None" = None
+    # Vocabulary of a featurizer created with from_vocabulary, until its sklearn vectorizer is built
+    _vocabulary: "list[str]"
+
     def __init__(self, max_vocab_size):
+        from sklearn.feature_extraction.text import CountVectorizer
+
         self.vectorizer_config = dict(
             ngram_range=(2, 6),
             analyzer="char",
@@ -73,12 +331,87 @@ class CharFeaturizer:
 
         self.vectorizer = CountVectorizer(**self.vectorizer_config)
 
+    @classmethod
+    def from_vocabulary(cls, vocabulary: list[str], vectorizer_config: dict):
+        """
+        Create a trained CharFeaturizer from its vocabulary, without loading sklearn.
+
+        :param vocabulary: The n-grams in the order of their feature columns.
+        :param vectorizer_config: The vectorizer config of the trained featurizer.
+        :return: An instance of CharFeaturizer.
+        """
+        instance = cls.__new__(cls)
+        instance.vectorizer_config = dict(vectorizer_config)
+        instance._vocabulary = list(vocabulary)
+        return instance
+
+    @property
+    def vectorizer(self):
+        """The sklearn vectorizer. Featurizers created from a vocabulary construct it on first use."""
+        vectorizer = self.__dict__.get("vectorizer")
+        if vectorizer is None:
+            from sklearn.feature_extraction.text import CountVectorizer
+
+            vectorizer = CountVectorizer(**self.vectorizer_config, vocabulary=self.__dict__["_vocabulary"])
+            self.__dict__["vectorizer"] = vectorizer
+        return vectorizer
+
+    @vectorizer.setter
+    def vectorizer(self, vectorizer):
+        self.__dict__["vectorizer"] = vectorizer
+        self.__dict__.pop("_vocabulary", None)
+        self.__dict__.pop("_ngram_vectorizer", None)
+
+    @property
+    def vocabulary(self) -> list[str]:
+        """The n-grams in the order of their feature columns."""
+        if "_vocabulary" in self.__dict__:
+            return self.__dict__["_vocabulary"]
+        vocabulary = getattr(self.vectorizer, "vocabulary_", None) or self.vectorizer.vocabulary
+        if isinstance(vocabulary, dict):
+            return sorted(vocabulary, key=vocabulary.__getitem__)
+        return list(vocabulary)
+
+    @property
+    def ngram_vectorizer(self) -> CharNgramVectorizer:
+        """Inference vectorizer compiled from the trained vocabulary on first use."""
+        ngram_vectorizer = self.__dict__.get("_ngram_vectorizer")
+        if ngram_vectorizer is None:
+            assert self.vectorizer_config.get("analyzer") == "char"
+            ngram_vectorizer = self._ngram_vectorizer = CharNgramVectorizer(
+                self.vocabulary,
+                self.vectorizer_config["ngram_range"],
+                lowercase=self.vectorizer_config.get("lowercase", True),
+            )
+        return ngram_vectorizer
+
+    def __getstate__(self):
+        # The cache is runtime state and must not end up in a checkpoint, the n-gram trie is compiled on load
+        state = self.__dict__.copy()
+        state.pop("cache", None)
+        state.pop("_ngram_vectorizer", None)
+        state.pop("_vocabulary", None)
+        state["vectorizer"] = self.vectorizer
+        return state
+
     @property
     def max_vocab_size(self):
         return self.vectorizer_config["max_features"]
 
+    def pruned(self, ngram_indices: Iterable[int]) -> "CharFeaturizer":
+        """
+        :param ngram_indices: Increasing indices of the vocabulary n-grams to keep.
+        :return: A trained CharFeaturizer over only these n-grams, counting each of them exactly like this one.
+        """
+        vocabulary = self.vocabulary
+        kept = [vocabulary[index] for index in ngram_indices]
+        return CharFeaturizer.from_vocabulary(kept, dict(self.vectorizer_config, max_features=len(kept)))
+
     def train(self, data):
+        from sklearn.feature_extraction.text import CountVectorizer
+
         flat_data = [item for sublist in data for item in sublist]
+        self.__dict__.pop("_ngram_vectorizer", None)
         self.vectorizer.fit(flat_data)
         vocabulary = self.vectorizer.get_feature_names_out()
         if self.PAD_TOKEN not in vocabulary:
@@ -92,7 +425,137 @@ class CharFeaturizer:
         return tokens + [self.PAD_TOKEN] * (3 - len(tokens))
 
     def transform(self, tokenized_texts: list[list[str]]):
-        tokenized_texts_flattened = [word for word_list in tokenized_texts for word in self.pad_tokens(word_list)]
-        transformed_data = self.vectorizer.transform(tokenized_texts_flattened)
-        padded_data = transformed_data
-        return np.reshape(padded_data, (padded_data.shape[0] // 3, -1))
+        # Vectorize each distinct token once, then gather its row for every window position it occupies
+        token_ids: dict[str, int] = {}
+        token_index = [
+            token_ids.setdefault(word, len(token_ids))
+            for word_list in tokenized_texts
+            for word in self.pad_tokens(word_list)
+        ]
+        token_data = self.transform_tokens(list(token_ids))
+        padded_data = token_data[token_index]
+        return np.reshape(padded_data, (len(tokenized_texts), 3 * token_data.shape[1]))
+
+    def transform_tokens(self, tokens: list[str]):
+        """
+        :return: A ``(len(tokens), vocabulary size)`` CSR matrix of n-gram counts.
+        """
+        if self.cache is None:
+            return self.ngram_vectorizer.transform(tokens)
+
+        rows = [self.cache.get(token) for token in tokens]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            computed = self.ngram_vectorizer.transform([tokens[i] for i in missing])
+            for j, i in enumerate(missing):
+                start, end = computed.indptr[j], computed.indptr[j + 1]
+                rows[i] = (computed.indices[start:end].copy(), computed.data[start:end].copy())
+                self.cache.put(tokens[i], rows[i])
+
+        indptr = np.zeros(len(rows) + 1, dtype=np.int32)
+        np.cumsum([len(indices) for indices, _ in rows], out=indptr[1:])
+        indices = np.concatenate([indices for indices, _ in rows]) if rows else np.zeros(0, dtype=np.int32)
+        data = np.concatenate([counts for _, counts in rows]) if rows else np.zeros(0, dtype=np.int64)
+        return csr_matrix((data, indices, indptr), shape=(len(rows), self.ngram_vectorizer.n_features))
+
+
+def assemble_windows(
+    char_rows, char_padding, name_rows: np.ndarray, window_index: np.ndarray, column_map: "np.ndarray|None" = None
+):
+    """
+    Writes char and name features of windows into one CSR matrix, straight from per-token feature rows.
+
+    A window row is laid out as ``[char(t0) | char(t1) | char(t2) | name(t0) | name(t1) | name(t2)]``, the same as
+    stacking ``CharFeaturizer.transform`` and ``NameFeaturizer.transform``. The column offset of each of the six
+    blocks is known up front, so every block is copied once into the output arrays, without reshaping or stacking
+    intermediate matrices.
+
+    :param char_rows: A ``(n_tokens, n_char)`` CSR matrix of token char features.
+    :param char_padding: A ``(1, n_char)`` CSR matrix of the char features of the padding token.
+    :param name_rows: A ``(n_tokens, FEATURE_PER_WORD)`` array of token name features.
+    :param window_index: A ``(n_windows, 3)`` array of token indices of every window, -1 for padding.
+    :param column_map: Keep only a subset of the columns: the output column of every input column, -1 for dropped
+        ones, see ``TextPipeline.select_columns``.
+    :return: A ``(n_windows, 3 * (n_char + FEATURE_PER_WORD))`` CSR matrix, with only the kept columns if
+        ``column_map`` is given.
+    """
+    indptr, indices, data, shape = _window_entries(char_rows, char_padding, name_rows, window_index, column_map)
+    return csr_matrix((data, indices.astype(np.int32), indptr.astype(np.int32)), shape=shape)
+
+
+def assemble_windows_dense(
+    char_rows,
+    char_padding,
+    name_rows: np.ndarray,
+    window_index: np.ndarray,
+    out: "np.ndarray|None" = None,
+    column_map: "np.ndarray|None" = None,
+) -> np.ndarray:
+    """
+    Writes the features of ``assemble_windows`` into a dense float32 matrix.
+
+    CatBoost reads dense features column by column, so the matrix is allocated in Fortran order, which it takes
+    without another transposed copy. Batches of a recurring size can pass a preallocated ``out`` buffer, which is
+    zeroed and filled in place.
+
+    :param out: A contiguous float32 array of shape ``(n_windows, n_features)``, allocated if not given.
+    :param column_map: Keep only a subset of the columns, see ``assemble_windows``.
+    :return: The filled feature matrix.
+    """
+    indptr, indices, data, shape = _window_entries(char_rows, char_padding, name_rows, window_index, column_map)
+    if out is None:
+        out = np.zeros(shape, dtype=np.float32, order="F")
+    elif out.dtype != np.float32 or out.shape != shape or not (out.flags.f_contiguous or out.flags.c_contiguous):
+        raise ValueError(f"Expected a contiguous float32 buffer of shape {shape}, got {out.dtype} {out.shape}")
+    else:
+        out.fill(0)
+
+    out[np.repeat(np.arange(shape[0]), np.diff(indptr)), indices] = data
+    return out
+
+
+def _window_entries(
+    char_rows, char_padding, name_rows: np.ndarray, window_index: np.ndarray, column_map: "np.ndarray|None" = None
+):
+    """
+    :return: A tuple of four items - CSR ``indptr``, ``indices`` and ``data`` arrays of the window features and the
+        matrix shape.
+    """
+    n_tokens, n_char = char_rows.shape
+    n_name = name_rows.shape[1]
+    window_index = np.asarray(window_index, dtype=np.int64).reshape(-1, 3)
+    n_windows = len(window_index)
+
+    # Source rows: tokens' char rows, char padding, tokens' name rows, name padding (all zero)
+    name_token_rows, name_columns = np.nonzero(name_rows)
+    lengths = np.concatenate(
+        [np.diff(char_rows.indptr), np.diff(char_padding.indptr), np.bincount(name_token_rows, minlength=n_tokens), [0]]
+    )
+    starts = np.cumsum(lengths) - lengths
+    source_indices = np.concatenate([char_rows.indices, char_padding.indices, name_columns])
+    source_data = np.concatenate([char_rows.data, char_padding.data, name_rows[name_token_rows, name_columns]])
+
+    # Source row of every block of every window, with padding mapped to the padding rows
+    window_index = np.where(window_index < 0, n_tokens, window_index)
+    blocks = np.concatenate([window_index, window_index + n_tokens + 1], axis=1).ravel()
+    block_lengths = lengths[blocks]
+    block_offsets = np.array([0, n_char, 2 * n_char, 3 * n_char, 3 * n_char + n_name, 3 * n_char + 2 * n_name])
+
+    indptr = np.zeros(n_windows + 1, dtype=np.int64)
+    np.cumsum(block_lengths.reshape(n_windows, 6).sum(axis=1), out=indptr[1:])
+
+    # Gather all blocks at once: position of every output entry inside its block, plus the block's source start
+    block_ends = np.cumsum(block_lengths)
+    positions = np.arange(indptr[-1]) - np.repeat(block_ends - block_lengths, block_lengths)
+    source = np.repeat(starts[blocks], block_lengths) + positions
+    indices = source_indices[source] + np.repeat(np.tile(block_offsets, n_windows), block_lengths)
+    data = source_data[source]
+    if column_map is None:
+        return indptr, indices, data, (n_windows, 3 * (n_char + n_name))
+
+    # Drop the entries of unused columns and renumber the others, entries stay sorted by row
+    indices = column_map[indices]
+    kept = indices >= 0
+    rows = np.repeat(np.arange(n_windows), np.diff(indptr))[kept]
+    np.cumsum(np.bincount(rows, minlength=n_windows), out=indptr[1:])
+    return indptr, indices[kept], data[kept], (n_windows, int(column_map.max()) + 1)
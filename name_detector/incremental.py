@@ -0,0 +1,85 @@
+import numpy as np
+
+from name_detector.detect_names import NameDetector
+
+
+class IncrementalScanner:
+    """
+    Scores a transcript that grows message by message, only looking at the windows that involve new words.
+
+    The last two words of the transcript are carried over with their tokens, because they are the only old words
+    a window with new words can start at. The cost of ``feed`` is therefore proportional to the new message, not to
+    the transcript. Over all calls, ``feed`` returns the same windows and probabilities as ``NameDetector.predict``
+    on the messages joined with ``separator``, with the detector's prefilter, first stage, window cache and feature
+    format applied alike.
+    """
+
+    # The longest window has three words, so at most two old words precede a new one in a window
+    CARRY = 2
+
+    def __init__(self, name_detector: "NameDetector|None" = None, separator: str = "\n"):
+        """
+        :param name_detector: The detector to score windows with, a new one is loaded by default.
+        :param separator: The text messages are joined with. It must not contain word characters.
+        """
+        name_detector = name_detector or NameDetector()
+        if name_detector.pipeline.filter.word_spans(separator):
+            raise ValueError(f"The separator must not contain word characters, got {separator!r}")
+        self.name_detector = name_detector
+        self.separator = separator
+        self.reset()
+
+    def reset(self):
+        """Start a new transcript."""
+        # Length of the transcript and number of messages fed so far
+        self.length = 0
+        self.n_messages = 0
+        # The carried words, their spans in the transcript and their tokens
+        self._words: list[str] = []
+        self._spans: list[tuple[int, int]] = []
+        self._tokens: list[str] = []
+
+    def feed(self, text: str):
+        """
+        Appends a message to the transcript and scores the windows that end in it.
+
+        :param text: The new message.
+        :return: A tuple of three lists - the new windows, their probabilities and their ``(start, end)`` character
+            offsets in the transcript, in the order of ``NameDetector.predict``.
+        """
+        pipeline = self.name_detector.pipeline
+        offset = self.length + (len(self.separator) if self.n_messages else 0)
+        self.length = offset + len(text)
+        self.n_messages += 1
+
+        word_spans = pipeline.filter.word_spans(text)
+        if not word_spans:
+            return [], np.zeros(0), []
+        new_words = [text[start:end] for start, end in word_spans]
+        words = self._words + new_words
+        spans = self._spans + [(start + offset, end + offset) for start, end in word_spans]
+
+        # Every word is preprocessed once, windows slice their tokens out of the carried and the new ones
+        tokens = self._tokens + pipeline.preprocessor.preprocess(" ".join(new_words))
+
+        ranges = [(start, end) for start, end in pipeline.sampler.window_ranges(len(words)) if end > len(self._words)]
+        windows = [" ".join(words[start:end]) for start, end in ranges]
+        window_spans = [(spans[start][0], spans[end - 1][1]) for start, end in ranges]
+
+        y_prob = np.zeros(len(windows))
+        name_detector = self.name_detector
+        prefilter = name_detector.prefilter
+        kept = [i for i, window in enumerate(windows) if prefilter is None or prefilter.window_reason(window) is None]
+        tokenized = [tokens[slice(*ranges[i])] for i in kept]
+        if kept and name_detector.first_stage is not None:
+            passed = name_detector.first_stage_passed(tokenized)
+            kept = [i for i, window_passed in zip(kept, passed) if window_passed]
+            tokenized = [window_tokens for window_tokens, window_passed in zip(tokenized, passed) if window_passed]
+        if kept:
+            y_prob[kept] = name_detector.score_tokenized(tokenized)
+
+        # Carry the last words over
+        self._words = words[-self.CARRY :]
+        self._spans = spans[-self.CARRY :]
+        self._tokens = tokens[-self.CARRY :]
+        return windows, y_prob, window_spans
@@ -1,10 +1,15 @@
+import argparse
 from logging import getLogger
-from typing import cast
+from typing import Iterable, cast
 
-import tqdm
-from joblib import dump, load
-from scipy.sparse import hstack
+import numpy as np
 
+from name_detector.cache import LRUCache
+from name_detector.checkpoint import (
+    is_inference_checkpoint,
+    load_inference_checkpoint,
+    save_inference_checkpoint,
+)
 from name_detector.data_preparation import (
     CaseAugmenter,
     LatinAugmenter,
@@ -12,13 +17,22 @@ from name_detector.data_preparation import (
     WordFilter,
     WordSampler,
 )
-from name_detector.featurizers import CharFeaturizer, NameFeaturizer
+from name_detector.featurizers import (
+    CharFeaturizer,
+    NameFeaturizer,
+    assemble_windows,
+    assemble_windows_dense,
+    automaton_from_arrays,
+    automaton_to_arrays,
+)
+from name_detector.instrumentation import Instrumentation, Sink
 from name_detector.utils import (
     count_cyrillic_words,
     create_balanced_train_set,
     load_base_names,
     load_csv_examples,
     load_txt_examples,
+    train_test_split,
 )
 
 logger = getLogger()
@@ -27,57 +41,303 @@ logger = getLogger()
 class TextPipeline:
     # TODO: augment trainset with lowercase examples
 
-    def __init__(self, max_vocab_size: int, base_names: list[str]):
-        self.filter = WordFilter()
-        self.sampler = WordSampler()
+    # Optional per-stage timing, see enable_instrumentation
+    instrumentation: "Instrumentation|None" = None
+    # Optional subset of feature columns a compacted model consumes, see select_columns
+    columns: "np.ndarray|None" = None
+    _column_map: "np.ndarray|None" = None
+
+    def __init__(self, max_vocab_size: int, base_names: list[str], keep_intermediates: bool = False):
+        self._init_components(CharFeaturizer(max_vocab_size), NameFeaturizer(base_names), keep_intermediates)
+
+    def _init_components(
+        self,
+        char_featurizer: CharFeaturizer,
+        name_featurizer: NameFeaturizer,
+        keep_intermediates: bool,
+        filter: "WordFilter|None" = None,
+        sampler: "WordSampler|None" = None,
+        preprocessor: "Preprocessor|None" = None,
+    ):
+        self.filter = filter or WordFilter()
+        self.sampler = sampler or WordSampler()
         self.case_augmenter = CaseAugmenter()
         self.latin_augmenter = LatinAugmenter()
-        self.preprocessor = Preprocessor()
-        self.char_featurizer = CharFeaturizer(max_vocab_size)
-        self.name_featurizer = NameFeaturizer(base_names)
+        self.preprocessor = preprocessor or Preprocessor()
+        self.char_featurizer = char_featurizer
+        self.name_featurizer = name_featurizer
 
-        # Intermediate results
+        # Intermediate results of the last call. They are only kept for debugging, because shared state
+        # would make concurrent calls on one pipeline overwrite each other.
+        self.keep_intermediates = keep_intermediates
         self.filtered_texts: list[str] = []
         self.sampled_texts: list[str] = []
         self.preprocessed_texts: list[list[str]] = []
         self.preprocessed_labels: list = []
 
     def train(self, data: list[str]):
-        self._process_data(data, train=True)
-        self.char_featurizer.train(self.preprocessed_texts)
-
-    def transform(self, data: list[str], labels: "list[int]|None" = None, train=False, progress=False):
-        self._process_data(data, labels, train=train, progress=progress)
+        preprocessed_texts, _ = self._process_data(data, train=True)
+        self.char_featurizer.train(preprocessed_texts)
+
+    def transform(
+        self,
+        data: list[str],
+        labels: "list[int]|None" = None,
+        train=False,
+        progress=False,
+        dense: bool = False,
+        out: "np.ndarray|None" = None,
+    ):
+        preprocessed_texts, labels = self._process_data(data, labels, train=train, progress=progress)
         logger.debug("Featurizing...")
-        char_features = self.char_featurizer.transform(self.preprocessed_texts)
-        name_features = self.name_featurizer.transform(self.preprocessed_texts)
-        labels = self.preprocessed_labels
-        features = hstack([char_features, name_features])
+        features = self.featurize(preprocessed_texts, dense=dense, out=out)
         return features, labels
 
+    def tokenize(self, data: list[str]) -> list[list[str]]:
+        """
+        Filters, samples and preprocesses texts like ``transform`` at inference, without featurizing them.
+
+        :return: The tokenized windows, the first one of every text.
+        """
+        preprocessed_texts, _ = self._process_data(data)
+        return preprocessed_texts
+
+    def transform_names(self, data: list[str], labels: "list[int]|None" = None, train=False):
+        """
+        Like ``transform``, but returns only the name features of the windows, which is all a first-stage model of
+        ``NameDetector`` consumes.
+
+        :return: A tuple of two items - a CSR matrix of ``3 * NameFeaturizer.FEATURE_PER_WORD`` columns and the labels.
+        """
+        preprocessed_texts, labels = self._process_data(data, labels, train=train)
+        return self.featurize_names(preprocessed_texts), labels
+
+    def featurize_names(self, tokenized_texts: list[list[str]]):
+        """
+        :return: A CSR matrix of the name features of tokenized windows, without any char features.
+        """
+        instrumentation = self.instrumentation
+        start = instrumentation.start() if instrumentation else 0.0
+        features = self.name_featurizer.transform(tokenized_texts)
+        if instrumentation:
+            instrumentation.record("NameFeaturizer", start, len(tokenized_texts))
+        return features
+
+    def featurize(self, tokenized_texts: list[list[str]], dense: bool = False, out: "np.ndarray|None" = None):
+        """
+        Featurizes tokenized windows into one matrix of char features followed by name features.
+
+        Each distinct token is featurized once and its rows are copied into every window it occurs in.
+
+        :param tokenized_texts: Windows of up to three tokens.
+        :param dense: Return a dense float32 array instead of a CSR matrix.
+        :param out: A preallocated float32 buffer of shape ``(len(tokenized_texts), n_features)`` that dense
+            features are written to, see ``assemble_windows_dense``.
+        :return: A CSR matrix or a dense array with one row per window.
+        """
+        token_ids: dict[str, int] = {}
+        window_index = np.full((len(tokenized_texts), 3), -1, dtype=np.int64)
+        for row, tokens in enumerate(tokenized_texts):
+            window_index[row, : len(tokens)] = [token_ids.setdefault(token, len(token_ids)) for token in tokens]
+
+        char_rows, name_rows = self.featurize_tokens(list(token_ids))
+        return self.assemble(char_rows, name_rows, window_index, dense=dense, out=out)
+
+    def featurize_tokens(self, tokens: list[str]):
+        """
+        :return: A tuple of two items - the CSR matrix of token char features and the array of token name features.
+        """
+        instrumentation = self.instrumentation
+        if not instrumentation:
+            return self.char_featurizer.transform_tokens(tokens), self.name_featurizer.transform_tokens(tokens)
+
+        start = instrumentation.start()
+        char_rows = self.char_featurizer.transform_tokens(tokens)
+        instrumentation.record("CharFeaturizer", start, len(tokens))
+        start = instrumentation.start()
+        name_rows = self.name_featurizer.transform_tokens(tokens)
+        instrumentation.record("NameFeaturizer", start, len(tokens))
+        return char_rows, name_rows
+
+    def assemble(
+        self,
+        char_rows,
+        name_rows: np.ndarray,
+        window_index: np.ndarray,
+        dense: bool = False,
+        out: "np.ndarray|None" = None,
+    ):
+        """
+        Assembles window feature rows from token features returned by ``featurize_tokens``.
+
+        :param window_index: A ``(n_windows, 3)`` array of token indices of every window, -1 for padding.
+        :param dense: Return a dense float32 array instead of a CSR matrix.
+        :param out: A preallocated float32 buffer for dense features.
+        :return: A CSR matrix or a dense array with one row per window.
+        """
+        instrumentation = self.instrumentation
+        start = instrumentation.start() if instrumentation else 0.0
+        char_padding = self.char_featurizer.transform_tokens([self.char_featurizer.PAD_TOKEN])
+        if dense or out is not None:
+            features = assemble_windows_dense(
+                char_rows, char_padding, name_rows, window_index, out=out, column_map=self._column_map
+            )
+        else:
+            features = assemble_windows(char_rows, char_padding, name_rows, window_index, self._column_map)
+        if instrumentation:
+            instrumentation.record("assemble", start, features.shape[0])
+        return features
+
+    @property
+    def n_features(self) -> int:
+        if self.columns is not None:
+            return len(self.columns)
+        return 3 * (len(self.char_featurizer.vocabulary) + NameFeaturizer.FEATURE_PER_WORD)
+
+    def select_columns(self, columns: "Iterable[int]|None"):
+        """
+        Make ``transform``, ``featurize`` and ``assemble`` return only a subset of the feature columns, e.g. the ones
+        a model compacted with ``CatBoostModel.compact`` consumes. Dropped columns are never materialized.
+
+        :param columns: Increasing indices of the kept columns among all columns, None to keep all of them.
+        """
+        if columns is None:
+            self.columns = self._column_map = None
+            return
+        columns = np.asarray(columns, dtype=np.int64)
+        n_features = len(self._column_map) if self._column_map is not None else self.n_features
+        if len(columns) and (np.any(np.diff(columns) <= 0) or columns[0] < 0 or columns[-1] >= n_features):
+            raise ValueError(f"Expected increasing column indices below {n_features}")
+        column_map = np.full(n_features, -1, dtype=np.int64)
+        column_map[columns] = np.arange(len(columns))
+        self.columns, self._column_map = columns, column_map
+
+    def enable_instrumentation(self, sinks: Iterable[Sink] = ()) -> Instrumentation:
+        """
+        Record wall time, calls and rows of every pipeline stage, see ``Instrumentation``.
+
+        :param sinks: Callables receiving ``(stage, seconds, rows)`` of every measurement.
+        :return: The Instrumentation collecting the stats.
+        """
+        self.instrumentation = Instrumentation(sinks)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        self.instrumentation = None
+
+    def enable_token_cache(self, maxsize: int):
+        """
+        Put bounded LRU caches in front of the per-token name and char features.
+
+        Repeated tokens then skip normalization, base name matching and n-gram counting across calls.
+
+        :param maxsize: The maximum number of tokens kept by each featurizer cache.
+        """
+        self.name_featurizer.cache = LRUCache(maxsize)
+        self.char_featurizer.cache = LRUCache(maxsize)
+
+    def disable_token_cache(self):
+        self.name_featurizer.cache = None
+        self.char_featurizer.cache = None
+
+    def token_cache_stats(self):
+        """
+        :return: Hit, miss and eviction counters of each featurizer cache, or None for disabled caches.
+        """
+        return {
+            "name_featurizer": self.name_featurizer.cache.stats() if self.name_featurizer.cache else None,
+            "char_featurizer": self.char_featurizer.cache.stats() if self.char_featurizer.cache else None,
+        }
+
+    def first_windows(self, texts: Iterable[str]) -> list[str]:
+        """
+        Windows labeled texts like the test set of the training notebook: only the first window of every text is kept,
+        texts of less than two words have none.
+
+        :return: The windows, tokenize them with ``tokenize_windows``.
+        """
+        return [window for text in texts for window in self.sampler.sample(self.filter.filter(text), sample_one=True)]
+
     def get_windows(self, text):
-        filtered_text = self.filter.filter(text)
+        return self.get_window_spans(text)[0]
+
+    def tokenize_windows(self, windows: list[str]) -> list[list[str]]:
+        """
+        Preprocesses windows as returned by ``get_windows``, which are filtered and sampled already.
+
+        :return: The tokenized windows, one per window, as ``tokenize`` returns them.
+        """
+        instrumentation = self.instrumentation
+        start = instrumentation.start() if instrumentation else 0.0
+        tokenized = [self.preprocessor.preprocess(window) for window in windows]
+        if instrumentation:
+            instrumentation.record("Preprocessor", start, len(tokenized))
+        return tokenized
+
+    def get_window_spans(self, text: str, return_tokens: bool = False):
+        """
+        Samples windows of two and three consecutive words, tokenizing the text once.
 
-        sampled_texts = self.sampler.sample(filtered_text, None)
-        return sampled_texts
+        :param return_tokens: Also return the tokenized windows, as ``tokenize`` returns them. They are sliced from
+            the preprocessed words, so every word is preprocessed once rather than once per window it occurs in.
+        :return: A tuple of two lists - windows and their ``(start, end)`` character offsets in ``text``, from the
+            start of the first word to the end of the last one. The list of tokenized windows follows if requested.
+        """
+        instrumentation = self.instrumentation
+        start = instrumentation.start() if instrumentation else 0.0
+        word_spans = self.filter.word_spans(text)
+        if instrumentation:
+            instrumentation.record("WordFilter", start, 1)
+            start = instrumentation.start()
+
+        words = [text[start:end] for start, end in word_spans]
+        ranges = self.sampler.window_ranges(len(words))
+        windows = [" ".join(words[start:end]) for start, end in ranges]
+        spans = [(word_spans[start][0], word_spans[end - 1][1]) for start, end in ranges]
+        if instrumentation:
+            instrumentation.record("WordSampler", start, len(windows))
+        if not return_tokens:
+            return windows, spans
+
+        start = instrumentation.start() if instrumentation else 0.0
+        # Words match \w+, so preprocessing keeps one token per word
+        tokens = self.preprocessor.preprocess(" ".join(words))
+        tokenized = [tokens[start:end] for start, end in ranges]
+        if instrumentation:
+            instrumentation.record("Preprocessor", start, len(tokenized))
+        return windows, spans, tokenized
 
     def _process_data(self, data: list[str], labels: "list[int]|None" = None, train=False, progress=False):
-        # Reset intermediate results
-        self.filtered_texts = []
-        self.sampled_texts = []
-        self.preprocessed_texts = []
-        self.preprocessed_labels = []
+        """
+        Filters, samples, augments and preprocesses texts.
+
+        All results are local to the call, so it is safe to call concurrently. With ``keep_intermediates`` the
+        results of the last call are also stored on the pipeline.
+
+        :return: A tuple of two lists - tokenized windows and their corresponding labels.
+        """
+        instrumentation = self.instrumentation
+        all_sampled_texts: list[str] = []
+        preprocessed_labels: list = []
 
         if labels is None:
             labels = [0] * len(data)
 
         assert len(labels) == len(data)
 
-        iterable = zip(data, labels)
-        for text, label in tqdm.tqdm(iterable) if progress else iterable:
-            filtered_text = self.filter.filter(text)
-            self.filtered_texts.append(filtered_text)
+        start = instrumentation.start() if instrumentation else 0.0
+        filtered_texts = [self.filter.filter(text) for text in data]
+        if instrumentation:
+            instrumentation.record("WordFilter", start, len(data))
+            start = instrumentation.start()
+
+        iterable = zip(filtered_texts, labels)
+        if progress:
+            import tqdm
 
+            iterable = tqdm.tqdm(iterable, total=len(data))
+
+        for filtered_text, label in iterable:
             sampled_texts, sampled_labels = self.sampler.sample(filtered_text, label, sample_one=not train)
 
             # Data augmentation
@@ -85,11 +345,23 @@ class TextPipeline:
                 sampled_texts, sampled_labels = self.latin_augmenter.augment(sampled_texts, sampled_labels)
                 sampled_texts, sampled_labels = self.case_augmenter.augment(sampled_texts, sampled_labels)
 
-            self.sampled_texts.extend(sampled_texts)
+            all_sampled_texts.extend(sampled_texts)
+            preprocessed_labels.extend(sampled_labels)
+
+        if instrumentation:
+            instrumentation.record("WordSampler", start, len(all_sampled_texts))
+            start = instrumentation.start()
+        preprocessed_texts = [self.preprocessor.preprocess(text) for text in all_sampled_texts]
+        if instrumentation:
+            instrumentation.record("Preprocessor", start, len(preprocessed_texts))
+
+        if self.keep_intermediates:
+            self.filtered_texts = filtered_texts
+            self.sampled_texts = all_sampled_texts
+            self.preprocessed_texts = preprocessed_texts
+            self.preprocessed_labels = preprocessed_labels
 
-            preprocessed_texts = [self.preprocessor.preprocess(text) for text in sampled_texts]
-            self.preprocessed_texts.extend(preprocessed_texts)
-            self.preprocessed_labels.extend(sampled_labels)
+        return preprocessed_texts, preprocessed_labels
 
     def save(self, filename: str):
         """
@@ -104,28 +376,70 @@ class TextPipeline:
             "char_featurizer": self.char_featurizer,
             "name_featurizer": self.name_featurizer,
         }
+        from joblib import dump
+
         dump(state, filename)
 
+    def export_inference(self, filename: str):
+        """
+        Save a compact inference-only checkpoint of the trained pipeline.
+
+        It holds the char n-gram vocabulary and the compiled prefix automaton of the base names, and loads much
+        faster than the joblib checkpoint written by ``save``. Load it with ``init_from``.
+
+        :param filename: The name of the file where the checkpoint will be saved.
+        """
+        config = {"char_featurizer": dict(self.char_featurizer.vectorizer_config)}
+        arrays: "dict[str, np.ndarray|list[str]]" = {
+            "vocabulary": self.char_featurizer.vocabulary,
+        }
+        for name, array in automaton_to_arrays(self.name_featurizer.base_names_automaton).items():
+            arrays[f"automaton.{name}"] = array
+        save_inference_checkpoint(filename, config, arrays)
+
     @classmethod
-    def init_from(cls, filename: str):
+    def init_from(cls, filename: str, keep_intermediates: bool = False):
         """
         Initialize a TextPipeline object from a saved file.
 
-        :param filename: The name of the file to load the object state from.
+        :param filename: The name of the file to load the object state from, either a joblib checkpoint written
+            by ``save`` or an inference checkpoint written by ``export_inference``.
+        :param keep_intermediates: Store intermediate results of the last call on the pipeline, for debugging.
         :return: An instance of TextPipeline initialized with the saved state.
         """
+        # Create a new instance of TextPipeline, bypassing __init__ which would preprocess all base names again
+        instance = cls.__new__(cls)
+
+        if is_inference_checkpoint(filename):
+            config, arrays = load_inference_checkpoint(filename)
+            vectorizer_config = dict(
+                config["char_featurizer"], ngram_range=tuple(config["char_featurizer"]["ngram_range"])
+            )
+            automaton = automaton_from_arrays(
+                arrays["automaton.edge_start"],
+                arrays["automaton.labels"],
+                arrays["automaton.targets"],
+                arrays["automaton.terminal"],
+            )
+            instance._init_components(
+                CharFeaturizer.from_vocabulary(arrays["vocabulary"], vectorizer_config),
+                NameFeaturizer.from_automaton(automaton),
+                keep_intermediates,
+            )
+            return instance
+
+        from joblib import load
+
         state = load(filename)
-        # Create a new instance of TextPipeline.
-        instance = cls(
-            max_vocab_size=state["char_featurizer"].max_vocab_size,
-            base_names=state["name_featurizer"].base_names,
-        )
         # Restore the state
-        instance.filter = state["filter"]
-        instance.sampler = state["sampler"]
-        instance.preprocessor = state["preprocessor"]
-        instance.char_featurizer = state["char_featurizer"]
-        instance.name_featurizer = state["name_featurizer"]
+        instance._init_components(
+            state["char_featurizer"],
+            state["name_featurizer"],
+            keep_intermediates,
+            filter=state["filter"],
+            sampler=state["sampler"],
+            preprocessor=state["preprocessor"],
+        )
         return instance
 
 
@@ -195,6 +509,32 @@ def prepare_data(config):
     )
 
 
+def add_data_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the ``prepare_data`` options and the detection threshold to the CLI of an evaluation script, read them back
+    with ``data_config``.
+    """
+    parser.add_argument("--data-dir", default="data", help="Directory with the training data of prepare_data.")
+    parser.add_argument("--chat-names-test-size", type=int, default=3000)
+    parser.add_argument("--negative-test-size", type=int, default=10000)
+    parser.add_argument("--only-cyrillic", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.5)
+
+
+def data_config(args: argparse.Namespace) -> dict:
+    """
+    :param args: Arguments parsed by a parser set up with ``add_data_arguments``.
+    :return: The ``prepare_data`` config of the arguments.
+    """
+    return {
+        "data_dir": args.data_dir,
+        "chat_names_test_size": args.chat_names_test_size,
+        "crm_train_examples": 10000,
+        "negative_test_size": args.negative_test_size,
+        "only_cyrillic": args.only_cyrillic,
+    }
+
+
 def prepare_pipeline(config):
     (
         positive_train_examples,
@@ -224,6 +564,10 @@ def prepare_pipeline(config):
     pipeline.save(pipeline_path)
     print(f"Pipeline saved at: {pipeline_path}")
 
+    if config.get("inference_pipeline_path"):
+        pipeline.export_inference(config["inference_pipeline_path"])
+        print(f"Inference pipeline saved at: {config['inference_pipeline_path']}")
+
     return {
         "pipeline": pipeline,
         "positive_train_examples": positive_train_examples,
@@ -233,6 +577,172 @@ def prepare_pipeline(config):
     }
 
 
+# A shallow model over the 12 name features, orders of magnitude cheaper than the full model
+FIRST_STAGE_MODEL_CONFIG = dict(
+    auto_class_weights="Balanced",
+    iterations=100,
+    learning_rate=0.3,
+    depth=4,
+    loss_function="Logloss",
+    eval_metric="AUC",
+    verbose=False,
+    allow_writing_files=False,
+)
+
+
+def recall_threshold(y_true, y_prob, recall: float) -> float:
+    """
+    :return: The highest threshold such that ``y_prob >= threshold`` keeps at least ``recall`` of the positives.
+    """
+    positive_prob = np.sort(np.asarray(y_prob)[np.asarray(y_true) == 1])
+    if not len(positive_prob):
+        return 0.0
+    return float(positive_prob[int(np.floor((1 - recall) * len(positive_prob)))])
+
+
+def train_first_stage(
+    pipeline: TextPipeline,
+    train_texts: list[str],
+    train_labels: list[int],
+    validation_texts: list[str],
+    validation_labels: list[int],
+    recall: float = 0.999,
+    model_config: "dict|None" = None,
+):
+    """
+    Trains the first-stage model of a ``NameDetector`` cascade on the name features of ``pipeline``.
+
+    The threshold that keeps ``recall`` of the positive validation windows is stored in the model metadata under
+    ``first_stage_threshold``, where ``NameDetector`` picks it up. Keep the test split out of both sets, so that
+    ``evaluate_cascade`` on it measures the recall the threshold really gives.
+
+    :param train_texts: Train texts, augmented and windowed like the full model's train set.
+    :param train_labels: Their labels. Labels of the full model (probability above 0.5) distill it instead.
+    :param validation_texts: Held-out texts the best iteration and the threshold are chosen on.
+    :param validation_labels: Their labels.
+    :param recall: The share of positive validation windows that must pass the first stage.
+    :param model_config: CatBoost parameters, ``FIRST_STAGE_MODEL_CONFIG`` by default.
+    :return: The trained CatBoostModel.
+    """
+    from name_detector.model import CatBoostModel
+
+    X_train, y_train = pipeline.transform_names(train_texts, train_labels, train=True)
+    X_val, y_val = pipeline.transform_names(validation_texts, validation_labels)
+
+    model = CatBoostModel(model_config or FIRST_STAGE_MODEL_CONFIG)
+    model.fit(X_train, y_train, eval_set=(X_val, y_val))
+    threshold = recall_threshold(y_val, model.predict_proba(X_val)[:, 1], recall)
+    model.get_metadata()["first_stage_threshold"] = repr(threshold)
+    return model
+
+
+def prepare_first_stage(config, result):
+    """
+    Trains and saves the first-stage model on the train split of ``prepare_pipeline``. A validation slice of it is
+    held out for early stopping and the threshold, the test split is not used.
+
+    :param config: The training config, with ``first_stage_model_path`` and optionally ``first_stage_recall``,
+        ``first_stage_validation_size`` and ``first_stage_negative_validation_size``.
+    :param result: The result of ``prepare_pipeline``.
+    :return: The trained CatBoostModel.
+    """
+    # Train positives repeat chat names, so the validation names are taken from the distinct ones and all their
+    # copies are left out of training
+    positive_train_examples, positive_validation_examples = train_test_split(
+        list(dict.fromkeys(result["positive_train_examples"])),
+        test_size=config.get("first_stage_validation_size", 1000),
+    )
+    validation_names = set(positive_validation_examples)
+    positive_train_examples = [ex for ex in result["positive_train_examples"] if ex not in validation_names]
+    neg_train_count = len(positive_train_examples) // 4
+    neg_validation_count = config.get("first_stage_negative_validation_size", 3000)
+    negative_train_examples, negative_validation_examples = train_test_split(
+        result["negative_train_examples"][: neg_train_count + neg_validation_count], test_size=neg_validation_count
+    )
+
+    print(f"Training first stage... Validation: {len(positive_validation_examples)} positive examples")
+    model = train_first_stage(
+        result["pipeline"],
+        positive_train_examples + negative_train_examples,
+        [1] * len(positive_train_examples) + [0] * len(negative_train_examples),
+        positive_validation_examples + negative_validation_examples,
+        [1] * len(positive_validation_examples) + [0] * len(negative_validation_examples),
+        recall=config.get("first_stage_recall", 0.999),
+    )
+    print(f"First stage threshold: {model.get_metadata()['first_stage_threshold']}")
+
+    model_path = config["first_stage_model_path"]
+    model.save(model_path)
+    print(f"First stage model saved at: {model_path}")
+    return model
+
+
+def prune_vocabulary(pipeline: TextPipeline, model) -> tuple:
+    """
+    Drops the char n-grams a trained model never uses from the vocabulary of its pipeline.
+
+    An n-gram is kept if the trees split on its column at any of the three window positions, i.e. if any of its
+    columns has a nonzero feature importance. The model is re-exported for the smaller feature layout of the pruned
+    pipeline, so the two stay consistent and predict exactly as before. Retraining on the pruned pipeline is possible
+    too, its vocabulary is fixed.
+
+    :param pipeline: The trained pipeline, without selected columns.
+    :param model: The CatBoostModel trained on its features, not compacted.
+    :return: A tuple of two items - the pruned pipeline, sharing all other components, and the re-exported model.
+    """
+    if pipeline.columns is not None or model.columns is not None:
+        raise ValueError("Prune the vocabulary before selecting or compacting columns")
+    n_char = len(pipeline.char_featurizer.vocabulary)
+    n_name = NameFeaturizer.FEATURE_PER_WORD
+
+    # Window rows are [char(t0) | char(t1) | char(t2) | name(t0) | name(t1) | name(t2)], all name columns are kept
+    used = model.used_columns()
+    ngram_indices = np.unique(used[used < 3 * n_char] % n_char)
+    columns = np.concatenate(
+        [position * n_char + ngram_indices for position in range(3)] + [np.arange(3 * n_char, 3 * (n_char + n_name))]
+    )
+
+    pruned = TextPipeline.__new__(TextPipeline)
+    pruned._init_components(
+        pipeline.char_featurizer.pruned(ngram_indices),
+        pipeline.name_featurizer,
+        pipeline.keep_intermediates,
+        filter=pipeline.filter,
+        sampler=pipeline.sampler,
+        preprocessor=pipeline.preprocessor,
+    )
+    return pruned, model.select_features(columns)
+
+
+def prune_checkpoints(config):
+    """
+    Prunes the vocabulary of the saved pipeline to what the saved model uses and overwrites both checkpoints, plus
+    their inference exports if their paths are configured.
+
+    :param config: The training config, with ``pipeline_path`` and ``cb_model_path``, and optionally
+        ``inference_pipeline_path`` and ``inference_model_path``.
+    :return: A tuple of two items - the pruned pipeline and the re-exported model.
+    """
+    from name_detector.model import CatBoostModel
+
+    pipeline = TextPipeline.init_from(config["pipeline_path"])
+    model = CatBoostModel.init_from(config["cb_model_path"])
+    n_vocabulary = len(pipeline.char_featurizer.vocabulary)
+    pipeline, model = prune_vocabulary(pipeline, model)
+    print(f"Pruned vocabulary: {n_vocabulary} -> {len(pipeline.char_featurizer.vocabulary)}")
+
+    pipeline.save(config["pipeline_path"])
+    model.save(config["cb_model_path"])
+    print(f"Pipeline and model saved at: {config['pipeline_path']}, {config['cb_model_path']}")
+    if config.get("inference_pipeline_path"):
+        pipeline.export_inference(config["inference_pipeline_path"])
+        print(f"Inference pipeline saved at: {config['inference_pipeline_path']}")
+    if config.get("inference_model_path"):
+        model.compact().save(config["inference_model_path"])
+        print(f"Inference model saved at: {config['inference_model_path']}")
+    return pipeline, model
+
+
 if __name__ == "__main__":
     config = {
         "chat_names_test_size": 3000,
@@ -240,9 +750,11 @@ if __name__ == "__main__":
         "vocab_size": 4000,
         "negative_test_size": 10000,
         "pipeline_path": "pipeline.joblib",
+        "first_stage_model_path": "first_stage_model.cbm",
         "only_cyrillic": False,
     }
     result = prepare_pipeline(config)
+    prepare_first_stage(config, result)
 
     print("Loading pipeline...")
     pipeline_path: str = cast(str, config["pipeline_path"])
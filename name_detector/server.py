@@ -0,0 +1,245 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from name_detector.detect_names import NameDetector
+
+
+class Metrics:
+    """
+    Thread-safe request counters and latency summaries, rendered in the Prometheus text format.
+
+    Quantiles are computed over the most recent ``window`` observations of every summary.
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, window: int = 10000):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = defaultdict(float)
+        self._observations: dict[tuple, deque] = defaultdict(lambda: deque(maxlen=window))
+        self._sums: dict[tuple, float] = defaultdict(float)
+        self._counts: dict[tuple, int] = defaultdict(int)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._observations[key].append(value)
+            self._sums[key] += value
+            self._counts[key] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f"{name}{self._format_labels(labels)} {value:g}")
+            for (name, labels), observations in sorted(self._observations.items()):
+                values = np.fromiter(observations, dtype=np.float64)
+                for q, quantile in zip(self.QUANTILES, np.quantile(values, self.QUANTILES)):
+                    lines.append(f"{name}{self._format_labels(labels + (('quantile', str(q)),))} {quantile:g}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {self._sums[(name, labels)]:g}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {self._counts[(name, labels)]}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _format_labels(labels: tuple) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class MicroBatcher:
+    """
+    Merges texts submitted from many threads into batches scored with a single ``predict_batch`` call.
+
+    A batch is scored once ``max_batch_size`` texts are collected or the oldest submission has waited
+    ``max_wait_ms``, whichever comes first.
+    """
+
+    def __init__(self, name_detector: NameDetector, max_batch_size: int = 64, max_wait_ms: float = 5.0, metrics=None):
+        self.name_detector = name_detector
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or Metrics()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="name-detector-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: list[str]) -> Future:
+        """
+        :param texts: The input text strings.
+        :return: A future of per-text lists of windows, per-text arrays of probabilities and per-text lists of
+            window character spans.
+        """
+        future: Future = Future()
+        self._queue.put((texts, future, time.perf_counter()))
+        return future
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            start = time.perf_counter()
+            for _, _, submitted in batch:
+                self.metrics.observe("name_detector_stage_latency_seconds", start - submitted, stage="queue")
+
+            texts = [text for texts, _, _ in batch for text in texts]
+            try:
+                windows, probabilities, _, spans = self.name_detector.predict_batch(texts, return_spans=True)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            self.metrics.observe("name_detector_stage_latency_seconds", time.perf_counter() - start, stage="inference")
+            self.metrics.observe("name_detector_batch_size", len(texts))
+
+            offset = 0
+            for request_texts, future, _ in batch:
+                end = offset + len(request_texts)
+                future.set_result((windows[offset:end], probabilities[offset:end], spans[offset:end]))
+                offset = end
+
+
+class NameDetectorHandler(BaseHTTPRequestHandler):
+    """
+    ``POST /detect`` scores ``{"text": ...}`` or ``{"texts": [...]}``.
+    ``GET /healthz`` and ``GET /metrics`` report liveness and Prometheus metrics.
+    """
+
+    ENDPOINTS = ("/detect", "/healthz", "/metrics")
+
+    server: "NameDetectorServer"
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._respond(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._respond(200, self.server.metrics.render(), content_type="text/plain; version=0.0.4")
+        else:
+            self._respond(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/detect":
+            self._respond(404, {"error": "not found"})
+            return
+
+        start = time.perf_counter()
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            single = "text" in request
+            texts = [request["text"]] if single else request["texts"]
+            if not isinstance(texts, list):
+                raise TypeError("texts must be a list")
+            if not all(isinstance(text, str) for text in texts):
+                raise ValueError("texts must be strings")
+        except (ValueError, KeyError, TypeError) as e:
+            self._respond(400, {"error": f"invalid request: {e}"})
+            return
+
+        try:
+            windows, probabilities, spans = self.server.batcher.submit(texts).result()
+        except Exception as e:
+            self._respond(500, {"error": str(e)})
+            return
+        results = [
+            {"windows": text_windows, "probabilities": text_probabilities.tolist(), "spans": text_spans}
+            for text_windows, text_probabilities, text_spans in zip(windows, probabilities, spans)
+        ]
+        self._respond(200, results[0] if single else {"results": results})
+
+        metrics = self.server.metrics
+        metrics.inc("name_detector_texts_total", len(texts))
+        metrics.observe("name_detector_stage_latency_seconds", time.perf_counter() - start, stage="request")
+
+    def _respond(self, status: int, body, content_type="application/json"):
+        payload = (body if isinstance(body, str) else json.dumps(body, ensure_ascii=False)).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        endpoint = self.path if self.path in self.ENDPOINTS else "other"
+        self.server.metrics.inc("name_detector_requests_total", endpoint=endpoint, status=status)
+
+    def log_message(self, format, *args):
+        # Access logs of a high throughput service are noise, metrics cover request counts
+        pass
+
+
+class NameDetectorServer(ThreadingHTTPServer):
+    """HTTP server that loads the detector once and micro-batches requests from all connections."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        name_detector: "NameDetector|None" = None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        stage_metrics: bool = False,
+    ):
+        super().__init__(address, NameDetectorHandler)
+        self.metrics = Metrics()
+        name_detector = name_detector or NameDetector()
+        if stage_metrics:
+            name_detector.pipeline.enable_instrumentation([self._observe_stage])
+        self.batcher = MicroBatcher(name_detector, max_batch_size, max_wait_ms, self.metrics)
+
+    def _observe_stage(self, stage: str, seconds: float, rows: int):
+        self.metrics.observe("name_detector_stage_latency_seconds", seconds, stage=stage)
+
+
+def main(argv: "list[str]|None" = None):
+    parser = argparse.ArgumentParser(description="Serve the Tajik name detector over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Texts scored with one model call.")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Longest wait for a batch to fill up.")
+    parser.add_argument("--token-cache-size", type=int, help="Cache features of this many distinct tokens.")
+    parser.add_argument("--window-cache-size", type=int, help="Cache probabilities of this many distinct windows.")
+    parser.add_argument("--stage-metrics", action="store_true", help="Export the latency of every pipeline stage.")
+    args = parser.parse_args(argv)
+
+    name_detector = NameDetector(token_cache_size=args.token_cache_size, window_cache_size=args.window_cache_size)
+    server = NameDetectorServer(
+        (args.host, args.port), name_detector, args.max_batch_size, args.max_wait_ms, stage_metrics=args.stage_metrics
+    )
+    print(f"Serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
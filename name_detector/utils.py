@@ -2,7 +2,6 @@ import re
 import unicodedata
 
 import numpy as np
-import pandas as pd
 
 
 def load_csv_examples(csv_path):
@@ -12,6 +11,8 @@ def load_csv_examples(csv_path):
     :param csv_path: Path to the CSV file.
     :return: List of negative examples.
     """
+    import pandas as pd
+
     try:
         df = pd.read_csv(csv_path, header=None)[0]
         df = df.dropna()
@@ -54,6 +55,8 @@ def load_base_names(data_dir: str):
         s = s.title()
         return s
 
+    import pandas as pd
+
     df = pd.read_csv(f"{data_dir}/names_data.csv")
     other_names = (
         df["Tajik"].apply(process_name).tolist()
@@ -107,24 +110,29 @@ class Transliterator:
 
     @classmethod
     def transliterate(cls, text: str):
-        translit_dict = cls.translit_dict
-        text = text.lower()
-        for special in cls.special_cases:
-            if special in text:
-                text = text.replace(special, translit_dict[special])
+        return transliterate(text)
 
-        transliterated_text = ""
-        for char in text:
-            if char in translit_dict:
-                transliterated_text += translit_dict[char]
-            else:
-                transliterated_text += char
-        return transliterated_text
 
+# Special cases never overlap (none ends with a letter another one starts with), so replacing all of them in one
+# regex pass gives the same result as replacing them one after another
+_translit_special_pattern = re.compile("|".join(Transliterator.special_cases))
+_translit_table = str.maketrans({k: v for k, v in Transliterator.translit_dict.items() if len(k) == 1})
 
-def latinize_text(name: str) -> str:
-    # Define the Cyrillic-to-Latin character mappings
-    cyrillic_to_latin_map = {
+
+def transliterate(text: str) -> str:
+    """
+    Transliterate Latin text to lowercase Tajik Cyrillic.
+
+    :param text: The text to be transliterated.
+    :return: Transliterated text.
+    """
+    text = _translit_special_pattern.sub(lambda match: Transliterator.translit_dict[match[0]], text.lower())
+    return text.translate(_translit_table)
+
+
+# Define the Cyrillic-to-Latin character mappings
+_cyrillic_to_latin_table = str.maketrans(
+    {
         "А": "A",
         "а": "a",
         "Б": "B",
@@ -205,15 +213,14 @@ def latinize_text(name: str) -> str:
         "Ӣ": "I",
         "ӣ": "i",
     }
+)
 
-    # Replace each Cyrillic character in the input string with its Latin equivalent
-    latinized_text = ""
-    for char in name:
-        latinized_text += cyrillic_to_latin_map.get(
-            char, char
-        )  # Default to the original character if not found in the map
 
-    return latinized_text
+def latinize_text(name: str) -> str:
+    if not isinstance(name, str):
+        raise TypeError(f"name must be a string, not {type(name).__name__}")
+    # Replace each Cyrillic character in the input string with its Latin equivalent, others are kept as is
+    return name.translate(_cyrillic_to_latin_table)
 
 
 def is_cyrillic(s: str):
@@ -15,6 +15,12 @@ setup(
     package_data={
         "name_detector": ["checkpoints/*"],
     },
+    entry_points={
+        "console_scripts": [
+            "name-detector=name_detector.detect_names:main",
+            "name-detector-server=name_detector.server:main",
+        ],
+    },
     author="Sobir Bobiev",
     author_email="sobir.bobiev@gmail.com",
     description="A simple fullname detector primarily built for Tajik names.",
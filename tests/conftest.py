@@ -0,0 +1,13 @@
+import pytest
+
+from name_detector.detect_names import NameDetector
+
+
+@pytest.fixture(scope="module")
+def name_detector():
+    return NameDetector()
+
+
+@pytest.fixture(scope="module")
+def prefilter_detector():
+    return NameDetector(prefilter=True)
@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from name_detector import AsyncNameDetector
+
+texts = [
+    "Гулрӯ Фаридунова Парвизович",
+    "Телефон",
+    "rustami farhod",
+    "Корти Виза баста шуд",
+    "Алиҷон Валиев рӯз аз рӯз худро беҳтар ҳис менамуд.",
+]
+
+
+@pytest.fixture
+def batch_sizes(name_detector, monkeypatch):
+    """Records the size of every batch ``name_detector`` scores."""
+    sizes = []
+    predict_batch = name_detector.predict_batch
+
+    def counting_predict_batch(texts):
+        sizes.append(len(texts))
+        return predict_batch(texts)
+
+    monkeypatch.setattr(name_detector, "predict_batch", counting_predict_batch)
+    return sizes
+
+
+def test_concurrent_calls_are_batched(name_detector, batch_sizes):
+    async def run():
+        async with AsyncNameDetector(name_detector, max_batch_size=4, max_wait_ms=50) as detector:
+            return await detector.detect_many(texts * 3)
+
+    results = asyncio.run(run())
+
+    assert sorted(batch_sizes) == [3, 4, 4, 4]
+    for text, (windows, y_prob) in zip(texts * 3, results):
+        expected_windows, expected_prob = name_detector.predict(text)
+        assert windows == expected_windows
+        np.testing.assert_allclose(y_prob, expected_prob)
+
+
+def test_single_call_waits_at_most_max_wait(name_detector, batch_sizes):
+    async def run():
+        detector = AsyncNameDetector(name_detector, max_batch_size=64, max_wait_ms=1)
+        return await detector.detect("Сардор Комронов")
+
+    windows, y_prob = asyncio.run(run())
+
+    assert batch_sizes == [1]
+    assert windows == ["Сардор Комронов"]
+    assert y_prob[0] > 0.5
+
+
+def test_errors_are_propagated_to_callers(name_detector):
+    async def run():
+        detector = AsyncNameDetector(name_detector, max_wait_ms=1)
+        return await detector.detect(None)  # type: ignore
+
+    with pytest.raises(TypeError):
+        asyncio.run(run())
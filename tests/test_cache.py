@@ -0,0 +1,38 @@
+import pytest
+
+from name_detector.cache import LRUCache
+
+
+def test_lru_eviction_order():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" becomes least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_lru_stats():
+    cache = LRUCache(1)
+    cache.get("a")
+    cache.put("a", 1)
+    cache.get("a")
+    cache.put("b", 2)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1)
+    assert stats["size"] == stats["maxsize"] == 1
+    assert stats["hit_rate"] == 0.5
+
+    cache.clear()
+    assert cache.stats()["hits"] == 0
+    assert len(cache) == 0
+
+
+def test_lru_invalid_size():
+    with pytest.raises(ValueError):
+        LRUCache(0)
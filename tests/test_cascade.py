@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from name_detector import IncrementalScanner
+from name_detector.cascade import evaluate_cascade
+from name_detector.detect_names import REASON_FIRST_STAGE, NameDetector
+from name_detector.pipeline import (
+    prepare_first_stage,
+    recall_threshold,
+    train_first_stage,
+)
+
+POSITIVE = [
+    "Рустами Фарҳод",
+    "Гулрӯ Фаридунова",
+    "Алиҷон Валиев",
+    "rustami farhod",
+    "Сардор Комронов",
+    "ЗАРИНА НАЗАРОВА",
+    "Қодир Шарипов",
+    "jamshed qurbonov",
+]
+NEGATIVE = [
+    "корти ман баста шуд",
+    "Телефон кор намекунад",
+    "салом чӣ хел",
+    "перевод на карту не дошёл",
+    "pul partoftam",
+    "раҳмат ҳамма чиз хуб",
+    "оплата счёт 44",
+    "kay meshavad",
+]
+
+
+@pytest.fixture(scope="module")
+def first_stage_path(name_detector, tmp_path_factory):
+    texts, labels = POSITIVE + NEGATIVE, [1] * len(POSITIVE) + [0] * len(NEGATIVE)
+    model = train_first_stage(name_detector.pipeline, texts, labels, texts, labels, recall=1.0)
+    path = str(tmp_path_factory.mktemp("cascade") / "first_stage_model.cbm")
+    model.save(path)
+    return path
+
+
+def test_recall_threshold():
+    y_true = [1, 1, 1, 1, 0, 0]
+    y_prob = [0.9, 0.2, 0.5, 0.7, 0.1, 0.6]
+
+    assert recall_threshold(y_true, y_prob, 1.0) == 0.2
+    assert recall_threshold(y_true, y_prob, 0.75) == 0.5
+    assert recall_threshold([0, 0], [0.3, 0.4], 1.0) == 0.0
+
+
+def test_cascade_predictions(name_detector, first_stage_path):
+    cascade = NameDetector(first_stage=first_stage_path)
+    assert 0 < cascade.first_stage_threshold < 1
+
+    texts = POSITIVE + NEGATIVE + ["Салом! Ман Рустами Фарҳод, корти ман баста шуд"]
+    windows, probabilities, _, reasons = cascade.predict_batch(texts, return_reasons=True)
+    expected_windows, expected_probabilities, _ = name_detector.predict_batch(texts)
+
+    assert windows == expected_windows
+    flat_reasons = [reason for text_reasons in reasons for reason in text_reasons]
+    assert REASON_FIRST_STAGE in flat_reasons
+    for y_prob, expected_prob, text_reasons in zip(probabilities, expected_probabilities, reasons):
+        skipped = np.array([reason == REASON_FIRST_STAGE for reason in text_reasons], dtype=bool)
+        np.testing.assert_allclose(y_prob[~skipped], expected_prob[~skipped])
+        assert (y_prob[skipped] == 0).all()
+
+    # The first stage keeps every name it was tuned on
+    for text in POSITIVE:
+        assert max(cascade.predict(text)[1]) > 0.5
+
+
+def test_cascade_threshold_zero(name_detector, first_stage_path):
+    cascade = NameDetector(first_stage=first_stage_path, first_stage_threshold=0.0)
+    text = "Салом! Ман Рустами Фарҳод, корти ман баста шуд"
+
+    np.testing.assert_allclose(cascade.predict(text)[1], name_detector.predict(text)[1])
+
+
+def test_incremental_scanner_cascade(first_stage_path):
+    cascade = NameDetector(first_stage=first_stage_path)
+    scanner = IncrementalScanner(cascade)
+    messages = ["Салом!", "Ман Рустами Фарҳод,", "корти ман баста шуд"]
+    y_prob = np.concatenate([scanner.feed(message)[1] for message in messages])
+
+    np.testing.assert_allclose(y_prob, cascade.predict("\n".join(messages))[1])
+
+
+def test_prepare_first_stage_uses_train_split_only(name_detector, tmp_path):
+    config = {
+        "first_stage_model_path": str(tmp_path / "first_stage_model.cbm"),
+        "first_stage_validation_size": 2,
+        "first_stage_negative_validation_size": 2,
+    }
+    # No test split is passed, the threshold is chosen on names held out of the train split
+    result = {
+        "pipeline": name_detector.pipeline,
+        "positive_train_examples": POSITIVE * 3,
+        "negative_train_examples": NEGATIVE,
+    }
+    model = prepare_first_stage(config, result)
+
+    cascade = NameDetector(first_stage=config["first_stage_model_path"])
+    assert cascade.first_stage_threshold == float(model.get_metadata()["first_stage_threshold"])
+
+
+def test_evaluate_cascade(first_stage_path):
+    results = evaluate_cascade(NameDetector(first_stage=first_stage_path), POSITIVE, NEGATIVE)
+
+    assert results["positive_windows"] == len(POSITIVE)
+    assert results["first_stage_recall"] == 1.0
+    assert results["cascade_recall"] == results["model_recall"]
+    assert results["lost_detections"] == 0
+    assert results["passed_negative_share"] < 1
+    assert results["speedup"] > 0
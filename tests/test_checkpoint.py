@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+from name_detector.checkpoint import (
+    load_inference_checkpoint,
+    save_inference_checkpoint,
+)
+from name_detector.detect_names import CHECKPOINTS_DIR
+from name_detector.pipeline import TextPipeline
+
+texts = [
+    "Алиҷон Валиев рӯз аз рӯз худро беҳтар ҳис менамуд. Модараш Марям аз ин хушҳол буд.",
+    "_Рустами_ Фарҳод 44 GHOZIEV ZAVKIBEK",
+    "gulru faridunova parvizovna",
+]
+
+
+@pytest.fixture(scope="module")
+def joblib_pipeline():
+    return TextPipeline.init_from(os.path.join(CHECKPOINTS_DIR, "pipeline.joblib"))
+
+
+def test_shipped_inference_checkpoint_matches_joblib(joblib_pipeline):
+    pipeline = TextPipeline.init_from(os.path.join(CHECKPOINTS_DIR, "pipeline_inference.bin"))
+
+    assert pipeline.char_featurizer.vocabulary == joblib_pipeline.char_featurizer.vocabulary
+    assert pipeline.name_featurizer.base_names == joblib_pipeline.name_featurizer.base_names
+    windows = [window for text in texts for window in pipeline.get_windows(text)]
+    X, _ = pipeline.transform(windows)
+    X_expected, _ = joblib_pipeline.transform(windows)
+    np.testing.assert_array_equal(X.toarray(), X_expected.toarray())
+
+
+def test_export_inference_round_trip(joblib_pipeline, tmp_path):
+    joblib_pipeline.export_inference(str(tmp_path / "pipeline.bin"))
+    pipeline = TextPipeline.init_from(str(tmp_path / "pipeline.bin"))
+
+    assert pipeline.char_featurizer.vectorizer_config == joblib_pipeline.char_featurizer.vectorizer_config
+    assert pipeline.name_featurizer.base_names == joblib_pipeline.name_featurizer.base_names
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_checkpoint_arrays(tmp_path, use_mmap):
+    arrays = {
+        "ids": np.arange(5, dtype=np.int32),
+        "flags": np.array([1, 0, 1], dtype=np.uint8),
+        "words": ["салом", "", "ҷон"],
+    }
+    save_inference_checkpoint(str(tmp_path / "checkpoint.bin"), {"answer": 42}, arrays)
+
+    config, loaded = load_inference_checkpoint(str(tmp_path / "checkpoint.bin"), use_mmap=use_mmap)
+
+    assert config == {"answer": 42}
+    np.testing.assert_array_equal(loaded["ids"], arrays["ids"])
+    np.testing.assert_array_equal(loaded["flags"], arrays["flags"])
+    assert loaded["words"] == arrays["words"]
+
+
+def test_checkpoint_version_mismatch(tmp_path, monkeypatch):
+    save_inference_checkpoint(str(tmp_path / "checkpoint.bin"), {}, {})
+    monkeypatch.setattr("name_detector.checkpoint.FORMAT_VERSION", 2)
+
+    with pytest.raises(ValueError, match="version"):
+        load_inference_checkpoint(str(tmp_path / "checkpoint.bin"))
@@ -0,0 +1,67 @@
+import json
+
+from name_detector.detect_names import main
+
+
+def test_stream_jsonl(tmp_path):
+    input_path = tmp_path / "messages.jsonl"
+    output_path = tmp_path / "result.jsonl"
+    records = [
+        {"message_id": "a", "text": "Салом! Ман Рустами Фарҳод."},
+        {"message_id": "b", "text": "Телефон"},
+        {"message_id": "c", "text": "gulru faridunova parvizovna"},
+    ]
+    input_path.write_text("\n".join(json.dumps(record, ensure_ascii=False) for record in records))
+
+    main(["-i", str(input_path), "-o", str(output_path), "-f", "jsonl", "--id-field", "message_id", "-b", "2"])
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [result["id"] for result in results] == ["a", "b", "c"]
+    for record, result in zip(records, results):
+        assert len(result["windows"]) == len(result["probabilities"]) == len(result["spans"])
+        for window, (start, end) in zip(result["windows"], result["spans"]):
+            assert window.split() == record["text"][start:end].replace("!", "").split()
+    assert results[1]["windows"] == []
+    assert max(results[0]["probabilities"]) > 0.5
+
+
+def test_stream_csv(tmp_path):
+    input_path = tmp_path / "messages.csv"
+    output_path = tmp_path / "result.jsonl"
+    input_path.write_text('id,body\n1,"Сардор Комронов"\n2,\n')
+
+    main(["-i", str(input_path), "-o", str(output_path), "-f", "csv", "--field", "body"])
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [result["id"] for result in results] == [0, 1]
+    assert results[0]["windows"] == ["Сардор Комронов"]
+    assert results[0]["spans"] == [[0, 15]]
+    assert results[1]["windows"] == []
+
+
+def test_stream_prefilter(tmp_path):
+    input_path = tmp_path / "messages.txt"
+    output_path = tmp_path / "result.jsonl"
+    input_path.write_text("Сардор Комронов\nту мо 44\n")
+
+    main(["-i", str(input_path), "-o", str(output_path), "--prefilter"])
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert results[0]["skip_reasons"] == [None]
+    assert results[1]["skip_reasons"] == ["no_base_name", "no_base_name", "no_base_name"]
+    assert results[1]["probabilities"] == [0, 0, 0]
+
+
+def test_stream_jsonl_skips_bad_records(tmp_path, capsys):
+    input_path = tmp_path / "messages.jsonl"
+    output_path = tmp_path / "result.jsonl"
+    lines = ['{"text": "Сардор Комронов"}', '{"text": 42}', '{"body": "Телефон"}', "{not json", '{"text": "Телефон"}']
+    input_path.write_text("\n".join(lines))
+
+    main(["-i", str(input_path), "-o", str(output_path), "-f", "jsonl"])
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [result["id"] for result in results] == [0, 4]
+    assert results[0]["windows"] == ["Сардор Комронов"]
+    errors = capsys.readouterr().err.splitlines()
+    assert [error.split(":")[0] for error in errors] == ["Skipping record 1", "Skipping record 2", "Skipping record 3"]
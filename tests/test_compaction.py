@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from name_detector.compaction import evaluate_compaction
+from name_detector.detect_names import CHECKPOINTS_DIR
+from name_detector.model import CatBoostModel
+from name_detector.pipeline import TextPipeline, prune_vocabulary
+
+TEXTS = [
+    "Рустами Фарҳод салом",
+    "Гулрӯ Фаридунова Парвизович",
+    "корти ман баста шуд",
+    "rustami farhod 44",
+    "Телефон",
+]
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return TextPipeline.init_from(f"{CHECKPOINTS_DIR}/pipeline_inference.bin")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return CatBoostModel.init_from(f"{CHECKPOINTS_DIR}/catboost_model.cbm")
+
+
+@pytest.fixture(scope="module")
+def windows(pipeline):
+    return [window for text in TEXTS for window in pipeline.get_windows(text)]
+
+
+def test_compact_keeps_predictions(pipeline, model, windows, tmp_path):
+    compact = model.compact()
+    assert model.columns is None
+    assert 0 < len(compact.columns) < pipeline.n_features
+    assert compact.tree_count == model.tree_count
+
+    X_input, _ = pipeline.transform(windows)
+    expected = model.predict_proba(X_input)
+    np.testing.assert_allclose(compact.predict_proba(X_input[:, compact.columns]), expected)
+
+    compact.save(str(tmp_path / "model.cbm"))
+    loaded = CatBoostModel.init_from(str(tmp_path / "model.cbm"))
+    np.testing.assert_array_equal(loaded.columns, compact.columns)
+
+
+def test_compact_tree_cap(model):
+    compact = model.compact()
+    capped = model.compact(50)
+    assert capped.tree_count == 50
+    assert set(capped.columns) <= set(compact.columns)
+
+    # Compacting a compacted model maps its columns back to the pipeline columns
+    np.testing.assert_array_equal(compact.compact(50).columns, capped.columns)
+
+
+@pytest.mark.parametrize("dense", [False, True])
+def test_select_columns(pipeline, model, windows, dense):
+    columns = model.compact().columns
+    X_full, _ = pipeline.transform(windows)
+    try:
+        pipeline.select_columns(columns)
+        assert pipeline.n_features == len(columns)
+        X_input, _ = pipeline.transform(windows, dense=dense)
+    finally:
+        pipeline.select_columns(None)
+
+    assert X_input.shape == (len(windows), len(columns))
+    np.testing.assert_array_equal(X_input if dense else X_input.toarray(), X_full[:, columns].toarray())
+    assert pipeline.n_features == X_full.shape[1]
+
+
+def test_select_columns_invalid(pipeline):
+    with pytest.raises(ValueError):
+        pipeline.select_columns([3, 1])
+    with pytest.raises(ValueError):
+        pipeline.select_columns([pipeline.n_features])
+    assert pipeline.columns is None
+
+
+def test_evaluate_compaction(pipeline, model):
+    results = evaluate_compaction(
+        pipeline, {"full": model, "compact": model.compact()}, TEXTS[:2], TEXTS[2:], batch_sizes=(1, 2), repeat=1
+    )
+
+    assert results["full"]["auc"] == results["compact"]["auc"]
+    assert results["compact"]["columns"] < results["full"]["columns"]
+    assert list(results["compact"]["latency_ms"]) == [1, 2]
+
+
+def test_prune_vocabulary(pipeline, model, windows):
+    pruned_pipeline, pruned_model = prune_vocabulary(pipeline, model)
+    vocabulary = pruned_pipeline.char_featurizer.vocabulary
+    assert set(vocabulary) <= set(pipeline.char_featurizer.vocabulary)
+    assert pruned_pipeline.name_featurizer is pipeline.name_featurizer
+
+    X_input, _ = pipeline.transform(windows)
+    X_pruned, _ = pruned_pipeline.transform(windows)
+    assert X_pruned.shape == (len(windows), pruned_pipeline.n_features)
+    np.testing.assert_allclose(pruned_model.predict_proba(X_pruned), model.predict_proba(X_input))
+
+    # Every kept n-gram is used by the model at some position
+    n_char = len(vocabulary)
+    used = pruned_model.used_columns()
+    assert set(used[used < 3 * n_char] % n_char) == set(range(n_char))
+
+
+def test_select_features_keeps_used_columns(model):
+    with pytest.raises(ValueError):
+        model.select_features(model.used_columns()[1:])
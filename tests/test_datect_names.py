@@ -1,6 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pytest
 
-from name_detector.detect_names import NameDetector
+from name_detector.detect_names import NameDetector, merge_spans
 
 
 class TestNameDetector:
@@ -80,3 +83,153 @@ class TestNameDetector:
         windows, y_prob = self.name_detector.predict(text)
         assert len(windows) == len(y_prob) > 0
         assert max(y_prob) < 0.3
+
+    def test_predict_batch(self):
+        texts = [
+            "Гулрӯ Фаридунова Парвизович",
+            "Телефон",
+            "",
+            "rustami farhod",
+            "Алиҷон Валиев рӯз аз рӯз худро беҳтар ҳис менамуд. Модараш Марям аз ин хушҳол буд.",
+        ]
+        windows, y_probs, offsets = self.name_detector.predict_batch(texts)
+        assert len(windows) == len(y_probs) == len(texts)
+        assert len(offsets) == len(texts) + 1
+        for i, text in enumerate(texts):
+            expected_windows, expected_prob = self.name_detector.predict(text)
+            assert windows[i] == expected_windows
+            assert offsets[i + 1] - offsets[i] == len(expected_windows)
+            np.testing.assert_allclose(y_probs[i], expected_prob)
+
+    def test_predict_batch_empty(self):
+        windows, y_probs, offsets = self.name_detector.predict_batch(["", "44"])
+        assert windows == [[], []]
+        assert [len(y_prob) for y_prob in y_probs] == [0, 0]
+        assert list(offsets) == [0, 0, 0]
+
+    def test_concurrent_predict(self):
+        texts = [
+            "Гулрӯ Фаридунова Парвизович",
+            "rustami farhod",
+            "Корти Виза баста шуд",
+            "Алиҷон Валиев рӯз аз рӯз худро беҳтар ҳис менамуд. Модараш Марям аз ин хушҳол буд.",
+        ] * 25
+        expected = [self.name_detector.predict(text) for text in texts]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(self.name_detector.predict, texts))
+
+        for (windows, y_prob), (expected_windows, expected_prob) in zip(results, expected):
+            assert windows == expected_windows
+            np.testing.assert_allclose(y_prob, expected_prob)
+
+    def test_scan_parallel(self):
+        texts = [
+            "Гулрӯ Фаридунова Парвизович",
+            "Телефон",
+            "rustami farhod",
+            "Корти Виза баста шуд",
+        ] * 10
+        results = list(self.name_detector.scan_parallel(iter(texts), workers=2, chunksize=3))
+
+        assert len(results) == len(texts)
+        for text, (windows, y_prob) in zip(texts, results):
+            expected_windows, expected_prob = self.name_detector.predict(text)
+            assert windows == expected_windows
+            np.testing.assert_allclose(y_prob, expected_prob)
+
+    @pytest.mark.parametrize("feature_format", ["dense", "pool"])
+    def test_dense_feature_formats(self, feature_format):
+        name_detector = NameDetector(feature_format=feature_format)
+        texts = ["Гулрӯ Фаридунова Парвизович", "Телефон", "rustami farhod", "Корти Виза баста шуд"]
+
+        # Repeated batch sizes reuse the same buffers
+        for _ in range(2):
+            windows, y_probs, _ = name_detector.predict_batch(texts)
+            expected_windows, expected_probs, _ = self.name_detector.predict_batch(texts)
+            assert windows == expected_windows
+            for y_prob, expected_prob in zip(y_probs, expected_probs):
+                np.testing.assert_allclose(y_prob, expected_prob)
+
+    def test_window_cache(self):
+        name_detector = NameDetector(window_cache_size=100)
+        texts = ["Корти Салом", "Корти Салом Рустами", "Гулрӯ Фаридунова", "Корти Салом"]
+
+        for _ in range(2):
+            windows, y_probs, _ = name_detector.predict_batch(texts)
+            expected_windows, expected_probs, _ = self.name_detector.predict_batch(texts)
+            assert windows == expected_windows
+            for y_prob, expected_prob in zip(y_probs, expected_probs):
+                np.testing.assert_allclose(y_prob, expected_prob)
+
+        stats = name_detector.window_cache_stats()
+        assert stats["size"] == 4
+        # Repeated windows of the first batch are looked up before they are scored
+        assert stats["misses"] == 6
+        assert stats["hits"] == 6
+        assert self.name_detector.window_cache_stats() is None
+
+        # Loading other checkpoints invalidates the cached probabilities
+        name_detector.model = self.name_detector.model
+        name_detector.predict("Корти Салом")
+        assert name_detector.window_cache_stats()["misses"] == 1
+
+    def test_unknown_feature_format(self):
+        with pytest.raises(ValueError):
+            NameDetector(feature_format="csc")
+
+    def test_predict_spans(self):
+        text = "Салом!  Ман, Рустами Фарҳод... _Алиҷон_"
+        windows, y_prob, spans = self.name_detector.predict(text, return_spans=True)
+
+        assert (windows, list(y_prob)) == tuple(map(list, self.name_detector.predict(text)))
+        assert len(spans) == len(windows)
+        for window, (start, end) in zip(windows, spans):
+            assert self.name_detector.pipeline.filter.filter(text[start:end]) == window
+        assert spans[0] == (0, 11)
+        assert spans[-1] == (21, 39)
+
+    def test_predict_batch_spans(self):
+        texts = ["Рустами Фарҳод салом", "", "gulru, faridunova"]
+        windows, _, _, spans = self.name_detector.predict_batch(texts, return_spans=True)
+
+        assert spans == [self.name_detector.predict(text, return_spans=True)[2] for text in texts]
+        assert spans[1] == []
+        assert spans[2] == [(0, 17)]
+
+    def test_extract(self):
+        text = "Салом! Ман Рустами Фарҳод. Телефон 44 кор намекунад"
+        names = self.name_detector.extract(text)
+
+        assert names and names[0][0].startswith("Рустами Фарҳод")
+        for name, start, end, probability in names:
+            assert text[start:end] == name
+            assert probability > 0.5
+        assert self.name_detector.extract(text, threshold=1) == []
+
+    def test_redact(self):
+        texts = ["Салом! Ман Рустами Фарҳод.", "Телефон", ""]
+        redacted = self.name_detector.redact_batch(texts)
+
+        assert redacted == [self.name_detector.redact(text) for text in texts]
+        assert "Рустами" not in redacted[0] and "[NAME]" in redacted[0]
+        assert redacted[0].startswith("Салом! Ман ")
+        assert redacted[1:] == texts[1:]
+
+        masked = self.name_detector.redact(texts[0], mask=lambda name: "*" * len(name))
+        assert len(masked) == len(texts[0]) and "*" in masked
+
+
+@pytest.mark.parametrize(
+    "spans,probabilities,expected",
+    [
+        ([], [], []),
+        ([(0, 5), (0, 9), (6, 9)], [0.1, 0.2, 0.3], []),
+        ([(0, 5), (0, 9), (6, 9), (6, 14)], [0.9, 0.7, 0.2, 0.6], [(0, 14, 0.9)]),
+        ([(0, 5), (6, 9), (12, 15)], [0.9, 0.2, 0.8], [(0, 5, 0.9), (12, 15, 0.8)]),
+        ([(0, 5), (5, 9)], [0.6, 0.7], [(0, 9, 0.7)]),
+        ([(0, 9), (3, 5)], [0.6, 0.7], [(0, 9, 0.7)]),
+    ],
+)
+def test_merge_spans(spans, probabilities, expected):
+    assert merge_spans(spans, probabilities, threshold=0.5) == expected
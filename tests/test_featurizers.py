@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+texts = [
+    "Алиҷон Валиев рӯз аз рӯз худро беҳтар ҳис менамуд. Модараш Марям аз ин хушҳол буд.",
+    "салом салом салом рахмат",
+    "_Рустами_ Фарҳод 44",
+    "gulru faridunova parvizovna",
+]
+
+
+@pytest.fixture(scope="module")
+def pipeline(name_detector):
+    return name_detector.pipeline
+
+
+@pytest.fixture(scope="module")
+def tokenized_windows(pipeline):
+    windows = [window for text in texts for window in pipeline.get_windows(text)]
+    return [pipeline.preprocessor.preprocess(window) for window in windows]
+
+
+def test_char_features_match_per_window_vectorization(pipeline, tokenized_windows):
+    featurizer = pipeline.char_featurizer
+    flat_tokens = [word for word_list in tokenized_windows for word in featurizer.pad_tokens(word_list)]
+    expected = featurizer.vectorizer.transform(flat_tokens).toarray().reshape(len(tokenized_windows), -1)
+
+    np.testing.assert_array_equal(featurizer.transform(tokenized_windows).toarray(), expected)
+
+
+def test_name_features_match_per_window_featurization(pipeline, tokenized_windows):
+    featurizer = pipeline.name_featurizer
+    expected = [
+        [feature for word in featurizer.pad_tokens(word_list) for feature in featurizer.featurize_word(word)]
+        for word_list in tokenized_windows
+    ]
+
+    np.testing.assert_array_equal(featurizer.transform(tokenized_windows).toarray(), expected)
+
+
+def test_token_cache_keeps_features_unchanged(pipeline, tokenized_windows):
+    expected_char = pipeline.char_featurizer.transform(tokenized_windows).toarray()
+    expected_name = pipeline.name_featurizer.transform(tokenized_windows).toarray()
+
+    pipeline.enable_token_cache(1000)
+    try:
+        for _ in range(2):
+            np.testing.assert_array_equal(
+                pipeline.char_featurizer.transform(tokenized_windows).toarray(), expected_char
+            )
+            np.testing.assert_array_equal(
+                pipeline.name_featurizer.transform(tokenized_windows).toarray(), expected_name
+            )
+        stats = pipeline.token_cache_stats()
+    finally:
+        pipeline.disable_token_cache()
+
+    for featurizer_stats in stats.values():
+        assert featurizer_stats["hits"] == featurizer_stats["misses"] == featurizer_stats["size"] > 0
+
+
+def test_featurize_word_matches_prefix_lookup(pipeline):
+    featurizer = pipeline.name_featurizer
+
+    def prefix_lookup(word):
+        word = featurizer.processor.normalize_cyrillic(word.strip("_")).lower()
+        sizes = [i for i in range(2, len(word)) if word[:i] in featurizer.base_names]
+        return len(sizes), max(sizes, default=0)
+
+    words = [word for text in texts for word in text.split()] + ["", "а", "Фаридуновна", "комронов", "ALIJON"]
+    words += list(featurizer.base_names)[:2000]
+    for word in words:
+        match_count, _, _, max_match_size = featurizer.featurize_word(word)
+        assert (match_count, max_match_size) == prefix_lookup(word), word
+
+
+def test_ngram_vectorizer_matches_sklearn(pipeline, tokenized_windows):
+    featurizer = pipeline.char_featurizer
+    tokens = [word for word_list in tokenized_windows for word in word_list]
+    tokens += featurizer.vocabulary + ["", "a", "__", "g__", "АЛИ_ҶОН", "a  b\t\tc d", "ааааааааа", "12345", "Ёр"]
+    tokens += list(pipeline.name_featurizer.base_names)[:2000]
+
+    expected = featurizer.vectorizer.transform(tokens)
+    result = featurizer.ngram_vectorizer.transform(tokens)
+
+    assert result.shape == expected.shape
+    np.testing.assert_array_equal(result.indptr, expected.indptr)
+    np.testing.assert_array_equal(result.indices, expected.indices)
+    np.testing.assert_array_equal(result.data, expected.data)
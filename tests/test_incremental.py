@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from name_detector import IncrementalScanner, NameDetector
+
+MESSAGES = [
+    "Салом!",
+    "Ман Рустами",
+    "Фарҳод, корти ман баста шуд",
+    "",
+    "...",
+    "Рустами",
+    "rustami farhod 44",
+]
+
+
+def test_feed_matches_predict_on_transcript(name_detector):
+    scanner = IncrementalScanner(name_detector)
+    windows, y_prob, spans = [], [], []
+    for message in MESSAGES:
+        new_windows, new_prob, new_spans = scanner.feed(message)
+        assert len(new_windows) == len(new_prob) == len(new_spans)
+        windows += new_windows
+        y_prob += list(new_prob)
+        spans += new_spans
+
+    transcript = "\n".join(MESSAGES)
+    expected_windows, expected_prob, expected_spans = name_detector.predict(transcript, return_spans=True)
+    assert windows == expected_windows
+    assert spans == expected_spans
+    np.testing.assert_allclose(y_prob, expected_prob)
+    assert scanner.length == len(transcript)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"feature_format": "dense", "window_cache_size": 64},
+        {"feature_format": "pool", "prefilter": True},
+    ],
+)
+def test_feed_uses_detector_options(options):
+    detector = NameDetector(**options)
+    scanner = IncrementalScanner(detector)
+    y_prob = np.concatenate([scanner.feed(message)[1] for message in MESSAGES + MESSAGES])
+
+    transcript = "\n".join(MESSAGES + MESSAGES)
+    np.testing.assert_allclose(y_prob, detector.predict(transcript)[1], rtol=1e-6)
+    if detector.window_cache is not None:
+        assert detector.window_cache_stats()["hits"] > 0
+
+
+def test_feed_scores_only_new_windows(name_detector):
+    scanner = IncrementalScanner(name_detector, separator=" | ")
+    scanner.feed("салом ман")
+
+    windows, _, spans = scanner.feed("Рустами Фарҳод")
+
+    assert windows == ["салом ман Рустами", "ман Рустами", "ман Рустами Фарҳод", "Рустами Фарҳод"]
+    assert spans[-1] == (12, 26)
+
+
+def test_reset(name_detector):
+    scanner = IncrementalScanner(name_detector)
+    scanner.feed("Салом ман")
+    scanner.reset()
+
+    assert scanner.feed("Рустами Фарҳод")[0] == ["Рустами Фарҳод"]
+    assert scanner.length == len("Рустами Фарҳод")
+
+
+def test_separator_without_word_characters(name_detector):
+    with pytest.raises(ValueError):
+        IncrementalScanner(name_detector, separator=" and ")
@@ -0,0 +1,60 @@
+import io
+
+import numpy as np
+
+from name_detector.instrumentation import Instrumentation, profile_stages
+
+TEXTS = ["Рустами Фарҳод салом", "Телефон", "корти ман баста шуд, Алиҷон Валиев 44"]
+
+
+def test_disabled_by_default(name_detector):
+    assert name_detector.pipeline.instrumentation is None
+
+
+def test_record_and_sinks():
+    measurements = []
+    instrumentation = Instrumentation([lambda *measurement: measurements.append(measurement)])
+    instrumentation.record("stage", instrumentation.start(), rows=3)
+    instrumentation.record("stage", instrumentation.start(), rows=2)
+
+    stats = instrumentation.stats()
+    assert list(stats) == ["stage"]
+    assert stats["stage"]["calls"] == 2
+    assert stats["stage"]["rows"] == 5
+    assert stats["stage"]["max_seconds"] <= stats["stage"]["seconds"]
+    assert [(stage, rows) for stage, _, rows in measurements] == [("stage", 3), ("stage", 2)]
+
+    instrumentation.reset()
+    assert instrumentation.stats() == {}
+
+
+def test_profile_stages(name_detector):
+    expected = name_detector.predict_batch(TEXTS)
+    stream = io.StringIO()
+
+    with profile_stages(name_detector, stream=stream) as instrumentation:
+        windows, probs, offsets = name_detector.predict_batch(TEXTS)
+
+    assert name_detector.pipeline.instrumentation is None
+    assert windows == expected[0]
+    np.testing.assert_allclose(np.concatenate(probs), np.concatenate(expected[1]))
+
+    stats = instrumentation.stats()
+    for stage in ["WordFilter", "WordSampler", "Preprocessor", "CharFeaturizer", "NameFeaturizer", "CatBoost"]:
+        assert stats[stage]["calls"] >= 1
+    n_windows = sum(len(text_windows) for text_windows in windows)
+    assert stats["CatBoost"]["rows"] == n_windows
+    assert stats["Preprocessor"]["rows"] == n_windows
+
+    report = stream.getvalue()
+    assert report.splitlines()[0].split()[0] == "stage"
+    assert "CatBoost" in report
+
+
+def test_profile_stages_prefilter(prefilter_detector):
+    with profile_stages(prefilter_detector, stream=None) as instrumentation:
+        prefilter_detector.predict("12 34 56")
+
+    stats = instrumentation.stats()
+    assert stats["prefilter"]["rows"] == 3
+    assert "CatBoost" not in stats
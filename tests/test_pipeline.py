@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+import pytest
+from scipy.sparse import hstack
+
+import name_detector
+from name_detector.pipeline import TextPipeline
+
+pipeline_path = os.path.join(os.path.dirname(name_detector.__file__), "checkpoints", "pipeline.joblib")
+
+
+def test_transform_keeps_no_intermediates_by_default():
+    pipeline = TextPipeline.init_from(pipeline_path)
+    features, labels = pipeline.transform(["Рустами Фарҳод", "салом рахмат"], [1, 0])
+
+    assert features.shape[0] == len(labels) == 2
+    assert labels == [1, 0]
+    assert pipeline.preprocessed_texts == []
+
+
+def test_transform_keeps_intermediates_for_debugging():
+    pipeline = TextPipeline.init_from(pipeline_path, keep_intermediates=True)
+    pipeline.transform(["Рустами Фарҳод!", "салом рахмат"], [1, 0])
+
+    assert pipeline.filtered_texts == ["Рустами Фарҳод", "салом рахмат"]
+    assert pipeline.sampled_texts == ["Рустами Фарҳод", "салом рахмат"]
+    assert pipeline.preprocessed_texts == [["Рустами", "Фарход"], ["салом", "рахмат"]]
+    assert pipeline.preprocessed_labels == [1, 0]
+
+
+def test_featurize_matches_stacked_featurizers():
+    pipeline = TextPipeline.init_from(pipeline_path)
+    tokenized_texts = [
+        ["Рустами", "Фарход"],
+        ["салом", "рахмат", "Рустами"],
+        ["44", "_Алиджон_", "рахмат"],
+        ["gulru", "faridunova"],
+    ]
+    expected = hstack(
+        [
+            pipeline.char_featurizer.transform(tokenized_texts),
+            pipeline.name_featurizer.transform(tokenized_texts),
+        ]
+    ).tocsr()
+
+    features = pipeline.featurize(tokenized_texts)
+
+    assert features.shape == expected.shape
+    assert features.has_sorted_indices
+    np.testing.assert_array_equal(features.toarray(), expected.toarray())
+    assert features.nnz == expected.nnz
+
+
+def test_featurize_empty():
+    pipeline = TextPipeline.init_from(pipeline_path)
+
+    assert pipeline.featurize([]).shape == (0, pipeline.n_features)
+    assert pipeline.featurize([], dense=True).shape == (0, pipeline.n_features)
+
+
+def test_featurize_dense_matches_sparse():
+    pipeline = TextPipeline.init_from(pipeline_path)
+    tokenized_texts = [["Рустами", "Фарход"], ["салом", "рахмат", "Рустами"], ["gulru", "faridunova"]]
+    expected = pipeline.featurize(tokenized_texts).toarray()
+
+    features = pipeline.featurize(tokenized_texts, dense=True)
+    assert features.dtype == np.float32
+    assert features.flags.f_contiguous
+    np.testing.assert_array_equal(features, expected)
+
+    # A reused buffer is cleared of the previous batch
+    out = np.full((2, pipeline.n_features), 7, dtype=np.float32, order="F")
+    assert pipeline.featurize(tokenized_texts[1:], out=out) is out
+    np.testing.assert_array_equal(out, expected[1:])
+
+    with pytest.raises(ValueError):
+        pipeline.featurize(tokenized_texts, out=out)
+
+
+def test_get_window_spans_matches_sampler():
+    pipeline = TextPipeline.init_from(pipeline_path)
+    text = "Салом!! ман-Рустами  Фарҳод, 44 _тест_\n rustami"
+
+    windows, spans = pipeline.get_window_spans(text)
+
+    assert windows == pipeline.sampler.sample(pipeline.filter.filter(text), None)
+    assert [text[start:end] for start, end in spans][:2] == ["Салом!! ман", "Салом!! ман-Рустами"]
+    for window, (start, end) in zip(windows, spans):
+        assert pipeline.filter.filter(text[start:end]) == window
+
+
+def test_get_window_spans_tokens_match_tokenize():
+    pipeline = TextPipeline.init_from(pipeline_path)
+    text = "Салом!! ман-Рустами  Фарҳод, 44 _тест_\n rustami Қодир"
+
+    windows, spans, tokenized = pipeline.get_window_spans(text, return_tokens=True)
+
+    assert tokenized == pipeline.tokenize(windows)
+    assert tokenized == pipeline.tokenize_windows(windows)
+
+
+def test_first_windows_match_tokenize():
+    pipeline = TextPipeline.init_from(pipeline_path)
+    texts = ["Салом!! ман-Рустами  Фарҳод, 44", "Телефон", "rustami farhod"]
+
+    windows = pipeline.first_windows(texts)
+
+    assert windows == ["Салом ман Рустами", "rustami farhod"]
+    assert pipeline.tokenize_windows(windows) == pipeline.tokenize(texts)
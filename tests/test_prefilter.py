@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from name_detector.prefilter import (
+    REASON_DIGITS,
+    REASON_NO_BASE_NAME,
+    REASON_TOO_SHORT,
+    evaluate_prefilter,
+)
+
+
+@pytest.mark.parametrize(
+    "token,expected",
+    [
+        ("2024", REASON_DIGITS),
+        ("_44_", REASON_DIGITS),
+        ("__44__", REASON_NO_BASE_NAME),
+        ("а", REASON_TOO_SHORT),
+        ("ту", REASON_NO_BASE_NAME),
+        ("почему", REASON_NO_BASE_NAME),
+        ("Фарҳод", None),
+        ("фарход", None),
+        ("_фарход_", None),
+        ("farhod", None),
+        ("Гулрӯ", None),
+        ("gulru", None),
+    ],
+)
+def test_token_reason(prefilter_detector, token, expected):
+    assert prefilter_detector.prefilter.token_reason(token) == expected
+
+
+@pytest.mark.parametrize(
+    "window,expected",
+    [
+        ("12 2024", REASON_DIGITS),
+        ("а 2024", REASON_TOO_SHORT),
+        ("ту мо 44", REASON_NO_BASE_NAME),
+        ("ту Фарҳод 44", None),
+    ],
+)
+def test_window_reason(prefilter_detector, window, expected):
+    assert prefilter_detector.prefilter.window_reason(window) == expected
+
+
+def test_predict_skips_windows(name_detector, prefilter_detector):
+    text = "ту мо 44 Рустами Фарҳод"
+    windows, y_prob, reasons = prefilter_detector.predict(text, return_reasons=True)
+    expected_windows, expected_prob = name_detector.predict(text)
+
+    assert windows == expected_windows
+    assert len(reasons) == len(windows)
+    skipped = np.array([reason is not None for reason in reasons])
+    assert skipped.any() and not skipped.all()
+    assert (y_prob[skipped] == 0).all()
+    np.testing.assert_allclose(y_prob[~skipped], expected_prob[~skipped])
+
+
+def test_predict_batch_reasons(prefilter_detector):
+    texts = ["Гулрӯ Фаридунова", "", "ту мо 44"]
+    windows, y_probs, _, reasons = prefilter_detector.predict_batch(texts, return_reasons=True)
+
+    assert [len(text_reasons) for text_reasons in reasons] == [len(text_windows) for text_windows in windows]
+    assert reasons[0] == [None] and reasons[1] == []
+    assert max(y_probs[0]) > 0.5
+    assert list(y_probs[2]) == [0, 0, 0]
+
+
+def test_evaluate_prefilter(prefilter_detector):
+    results = evaluate_prefilter(
+        prefilter_detector, ["Гулрӯ Фаридунова", "rustami farhod"], ["ту мо 44", "корти баста шуд"], threshold=0.5
+    )
+
+    assert results["positive_windows"] == results["negative_windows"] == 2
+    assert results["gate_recall"] == results["gated_model_recall"] == 1
+    assert results["lost_detections"] == 0
+    assert results["skipped_negative_share"] == 0.5
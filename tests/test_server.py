@@ -0,0 +1,95 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from name_detector.server import Metrics, NameDetectorServer
+
+
+@pytest.fixture(scope="module")
+def server_url(name_detector):
+    server = NameDetectorServer(("127.0.0.1", 0), name_detector, max_batch_size=8, max_wait_ms=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), method="POST")
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_detect_single(server_url):
+    result = post(f"{server_url}/detect", {"text": "Сардор Комронов"})
+
+    assert result["windows"] == ["Сардор Комронов"]
+    assert result["probabilities"][0] > 0.5
+    assert result["spans"] == [[0, 15]]
+
+
+def test_detect_batch(server_url):
+    result = post(f"{server_url}/detect", {"texts": ["Рустами Фарҳод салом", "Телефон"]})
+
+    assert [len(item["windows"]) for item in result["results"]] == [3, 0]
+    assert [len(item["probabilities"]) for item in result["results"]] == [3, 0]
+
+
+def test_detect_invalid_request(server_url):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(f"{server_url}/detect", {"texts": [1, 2]})
+    assert error.value.code == 400
+
+
+def test_detect_texts_not_a_list(server_url):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(f"{server_url}/detect", {"texts": "Сардор Комронов"})
+    assert error.value.code == 400
+
+
+def test_healthz_and_metrics(server_url):
+    post(f"{server_url}/detect", {"text": "Алиҷон Валиев"})
+
+    with urllib.request.urlopen(f"{server_url}/healthz") as response:
+        assert json.loads(response.read()) == {"status": "ok"}
+    with urllib.request.urlopen(f"{server_url}/metrics") as response:
+        metrics = response.read().decode()
+
+    assert 'name_detector_requests_total{endpoint="/detect",status="200"}' in metrics
+    assert 'name_detector_stage_latency_seconds{stage="inference",quantile="0.99"}' in metrics
+    assert "name_detector_batch_size_count" in metrics
+
+
+def test_metrics_render():
+    metrics = Metrics()
+    metrics.inc("requests_total", status=200)
+    for value in range(1, 101):
+        metrics.observe("latency_seconds", value, stage="model")
+
+    lines = metrics.render().splitlines()
+
+    assert 'requests_total{status="200"} 1' in lines
+    assert 'latency_seconds{stage="model",quantile="0.5"} 50.5' in lines
+    assert 'latency_seconds_sum{stage="model"} 5050' in lines
+    assert 'latency_seconds_count{stage="model"} 100' in lines
+
+
+def test_stage_metrics(name_detector):
+    server = NameDetectorServer(("127.0.0.1", 0), name_detector, max_batch_size=8, max_wait_ms=1, stage_metrics=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        post(f"{url}/detect", {"text": "Сардор Комронов"})
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            metrics = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+        name_detector.pipeline.disable_instrumentation()
+
+    assert 'name_detector_stage_latency_seconds_count{stage="CatBoost"} 1' in metrics
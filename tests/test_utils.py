@@ -1,6 +1,12 @@
 import pytest
 
-from name_detector.utils import is_cyrillic, latinize_text
+from name_detector.data_preparation import Preprocessor, normalize_cyrillic
+from name_detector.utils import (
+    Transliterator,
+    is_cyrillic,
+    latinize_text,
+    transliterate,
+)
 
 
 def test_basic_latinization():
@@ -131,3 +137,33 @@ def test_latinization_with_non_cyrillic(input_text, expected):
 )
 def test_is_cyrillic(input_text, expected):
     assert is_cyrillic(input_text) == expected
+
+
+@pytest.mark.parametrize(
+    "input_text,expected",
+    [
+        ("Pochemu", "почему"),
+        ("Shohina Yulduz", "шоҳина юлдуз"),
+        ("Zhavob ghalla", "жавоб ғалла"),
+        ("qarz jon hamma", "қарз ҷон ҳамма"),
+        ("shch", "шч"),
+        ("Салом 2024!", "салом 2024!"),
+        ("", ""),
+    ],
+)
+def test_transliterate(input_text, expected):
+    assert transliterate(input_text) == expected
+    assert Transliterator.transliterate(input_text) == expected
+
+
+@pytest.mark.parametrize(
+    "input_text,expected",
+    [
+        ("Алиҷон Қодирӣ", "Аличон Кодири"),
+        ("ҒАФУРОВ ҲОМИД Ӯктам", "ГАФУРОВ ХОМИД Уктам"),
+        ("Привет, мир", "Привет, мир"),
+    ],
+)
+def test_normalize_cyrillic(input_text, expected):
+    assert normalize_cyrillic(input_text) == expected
+    assert Preprocessor().normalize_cyrillic(input_text) == expected